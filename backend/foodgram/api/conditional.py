@@ -0,0 +1,62 @@
+"""Условные GET-запросы (ETag / Last-Modified)."""
+from hashlib import md5
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """Собирает ETag из значений, от которых зависит ответ."""
+
+    return quote_etag(md5(
+        '|'.join(str(part) for part in parts).encode(),
+        usedforsecurity=False
+    ).hexdigest())
+
+
+def conditional_response(request, get_response, etag, last_modified=None):
+    """Отвечает 304 без построения ответа, если у клиента актуальная копия.
+
+    `last_modified` передаётся только для ответов, которые не зависят от
+    пользователя: для них достаточно даты изменения объектов.
+    """
+
+    timestamp = last_modified and int(last_modified.timestamp())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    if response is None:
+        response = get_response()
+    response['ETag'] = etag
+    if timestamp:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalReadMixin:
+    """Валидаторы кэша для списков и объектов с полем `updated_at`."""
+
+    def list(self, request, *args, **kwargs):
+        state = self.filter_queryset(self.get_queryset()).aggregate(
+            last_modified=Max('updated_at'), count=Count('id')
+        )
+        return conditional_response(
+            request,
+            lambda: super(ConditionalReadMixin, self).list(
+                request, *args, **kwargs
+            ),
+            make_etag(request.get_full_path(), *state.values()),
+            state['last_modified'],
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request,
+            lambda: Response(self.get_serializer(instance).data),
+            make_etag(instance.pk, instance.updated_at),
+            instance.updated_at,
+        )
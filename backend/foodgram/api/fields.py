@@ -0,0 +1,84 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки и размеры уменьшенных копий изображения рецепта."""
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        storage = self.parent.Meta.model.image.field.storage
+        renditions = {}
+        for name, variant in value.get('variants', {}).items():
+            url = storage.url(variant['name'])
+            renditions[name] = {
+                'url': request.build_absolute_uri(url) if request else url,
+                'width': variant['width'],
+                'height': variant['height'],
+            }
+        return renditions
+
+
+class ImagePlaceholderField(serializers.ReadOnlyField):
+    """Размытая заглушка изображения рецепта в виде data URI."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'image_renditions')
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return value.get('placeholder')
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список связанных объектов, загружаемых одним запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.to_internal_values(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Связанный объект по первичному ключу.
+
+    Со списком значений все объекты загружаются одним запросом, а
+    несуществующие ключи перечисляются в одной ошибке.
+    """
+
+    default_error_messages = {
+        'does_not_exist_many': 'Объекты с id {pk_values} не существуют.',
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_internal_values(self, data):
+        if self.pk_field is not None:
+            data = [self.pk_field.to_internal_value(value) for value in data]
+        queryset = self.get_queryset()
+        pk = queryset.model._meta.pk
+        keys = []
+        for value in data:
+            try:
+                if isinstance(value, bool):
+                    raise TypeError
+                keys.append(pk.to_python(value))
+            except (TypeError, ValueError, DjangoValidationError):
+                self.fail('incorrect_type', data_type=type(value).__name__)
+        objects = queryset.in_bulk(set(keys))
+        missing = [key for key in dict.fromkeys(keys) if key not in objects]
+        if missing:
+            self.fail(
+                'does_not_exist_many',
+                pk_values=', '.join(str(key) for key in missing)
+            )
+        return [objects[key] for key in keys]
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.snapshots import SNAPSHOTS, snapshot_path, write_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Запись JSON-снимков тегов и ингредиентов в MEDIA_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names',
+            nargs='*',
+            help=f'Снимки для записи: {", ".join(SNAPSHOTS)}. '
+                 f'По умолчанию все.',
+        )
+
+    def handle(self, **options):
+        names = options['names'] or SNAPSHOTS
+        unknown = set(names) - set(SNAPSHOTS)
+        if unknown:
+            raise CommandError(f'Неизвестные снимки: {", ".join(unknown)}')
+        for name in names:
+            write_snapshot(name)
+            self.stdout.write(f'Снимок {name} записан в {snapshot_path(name)}')
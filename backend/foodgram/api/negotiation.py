@@ -0,0 +1,46 @@
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.utils.mediatypes import media_type_matches
+
+
+def quality(media_type):
+    try:
+        return float(parse_header_parameters(media_type)[1].get('q', 1))
+    except ValueError:
+        return 0
+
+
+class ClientOrderContentNegotiation(DefaultContentNegotiation):
+    """Выбор рендерера в порядке, указанном клиентом в заголовке Accept.
+
+    DRF среди типов одинаковой точности берёт первый подходящий рендерер
+    представления. Здесь типы перебираются по убыванию `q`, а при равном
+    `q` в порядке заголовка; `*/*` выбирает первый рендерер, а типы с
+    `q=0` исключаются. Параметр `?format=` выбирает рендерер независимо
+    от заголовка, а на неизвестный формат возвращается 406.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = format_suffix or request.query_params.get(
+            self.settings.URL_FORMAT_OVERRIDE
+        )
+        if format:
+            for renderer in renderers:
+                if renderer.format == format:
+                    return renderer, renderer.media_type
+            raise NotAcceptable(available_renderers=renderers)
+        accepts = self.get_accept_list(request)
+        excluded = [
+            media_type for media_type in accepts if quality(media_type) <= 0
+        ]
+        renderers = [
+            renderer for renderer in renderers
+            if not any(media_type_matches(renderer.media_type, media_type)
+                       for media_type in excluded)
+        ]
+        for media_type in sorted(accepts, key=quality, reverse=True):
+            for renderer in renderers:
+                if media_type_matches(renderer.media_type, media_type):
+                    return renderer, renderer.media_type
+        raise NotAcceptable(available_renderers=renderers)
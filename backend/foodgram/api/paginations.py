@@ -1,7 +1,42 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class PageLimitPaginator(PageNumberPagination):
     """Класс для переопределения параметра для пагинации"""
 
     page_size_query_param = 'limit'
+
+
+class CursorLimitPaginator(CursorPagination):
+    """Пагинация по курсору без подсчёта общего количества объектов."""
+
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+
+class OptionalCursorPaginator(PageLimitPaginator):
+    """Постраничная пагинация с переходом на курсор.
+
+    Если в запросе передан параметр `cursor` (пустой для первой
+    страницы), выдача строится по курсору без `COUNT(*)` и `OFFSET`.
+    Порядок для курсора задаётся атрибутом представления
+    `cursor_ordering`.
+    """
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if CursorLimitPaginator.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = CursorLimitPaginator()
+        self.cursor_paginator.ordering = getattr(
+            view, 'cursor_ordering', CursorLimitPaginator.ordering
+        )
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view
+        )
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,151 @@
+"""Общий кэш ответов со списком и страницами рецептов.
+
+В кэше хранятся данные ответа без пользовательских признаков. Для
+авторизованных пользователей признаки избранного, списка покупок и
+подписки накладываются поверх общих данных.
+
+Ключи содержат версию данных, которая берётся из базы: число строк и
+время последнего изменения рецептов, тегов, ингредиентов, авторов и
+рейтингов. Поэтому изменения из любого процесса, в том числе команд
+управления, видны не позже чем через `RECIPE_CACHE_VERSION_TIMEOUT`
+секунд, а изменения через сигналы этого процесса — сразу.
+"""
+from copy import deepcopy
+from hashlib import md5
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, Max, Value
+from rest_framework.response import Response
+
+from api.users.serializers import FoodgramUserSerializer
+from foodgram.constants import RECIPE_CACHE_VERSION_TIMEOUT
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe, RecipeScore,
+                            ShoppingCart, Tag, User)
+
+response_cache = caches['responses']
+
+VERSION_KEY = 'recipes:version'
+HITS_KEY = 'recipes:hits'
+MISSES_KEY = 'recipes:misses'
+
+CACHED_PARAMS = ('tags', 'author', 'ingredients', 'ingredients_mode',
+                 'exclude_ingredients', 'page', 'limit', 'search', 'cursor',
+                 'ordering')
+"""Параметры запроса, от которых зависит общий ответ."""
+
+USER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+"""Параметры, делающие выдачу зависящей от пользователя."""
+
+VERSIONED_FIELDS = (
+    (Recipe, 'updated_at'),
+    (Tag, 'updated_at'),
+    (Ingredient, 'updated_at'),
+    (User, 'updated_at'),
+    (RecipeScore, 'computed_at'),
+)
+"""Модели, от которых зависят ответы, и поля времени их изменения."""
+
+
+def data_version():
+    """Возвращает версию данных ответов, прочитанную одним запросом."""
+
+    first, *rest = (
+        model.objects.order_by().values(
+            model=Value(model._meta.label)
+        ).annotate(
+            count=Count('pk'), last=Max(field)
+        ).values_list('model', 'count', 'last')
+        for model, field in VERSIONED_FIELDS
+    )
+    return md5(
+        str(sorted(first.union(*rest, all=True))).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+
+
+def invalidate_recipe_cache():
+    """Перечитывает версию данных после фиксации транзакции."""
+
+    transaction.on_commit(lambda: response_cache.delete(VERSION_KEY))
+
+
+def count(key):
+    response_cache.add(key, 0, None)
+    try:
+        response_cache.incr(key)
+    except ValueError:
+        pass
+
+
+def cache_stats():
+    return {
+        'hits': response_cache.get(HITS_KEY, 0),
+        'misses': response_cache.get(MISSES_KEY, 0),
+    }
+
+
+def is_cacheable(request):
+    return not (request.user.is_authenticated
+                and any(param in request.query_params
+                        for param in USER_PARAMS))
+
+
+def cache_key(request, pk=None):
+    version = response_cache.get_or_set(
+        VERSION_KEY, data_version, RECIPE_CACHE_VERSION_TIMEOUT
+    )
+    params = sorted(
+        (param, sorted(request.query_params.getlist(param)))
+        for param in CACHED_PARAMS if param in request.query_params
+    )
+    return 'recipes:' + md5(
+        f'{version}|{pk}|{params}'.encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+def recipes_in(data):
+    return data['results'] if 'results' in data else [data]
+
+
+def set_user_flags(data, favorited=(), in_cart=(), followed=()):
+    for recipe in recipes_in(data):
+        recipe['is_favorited'] = recipe['id'] in favorited
+        recipe['is_in_shopping_cart'] = recipe['id'] in in_cart
+        recipe['author']['is_subscribed'] = recipe['author']['id'] in followed
+    return data
+
+
+def overlay_user_flags(data, request):
+    """Накладывает признаки пользователя на общие данные ответа."""
+
+    if not request.user.is_authenticated:
+        return data
+    ids = [recipe['id'] for recipe in recipes_in(data)]
+    return set_user_flags(
+        data,
+        favorited=set(FavoriteRecipe.objects.filter(
+            user=request.user, recipe__in=ids
+        ).values_list('recipe_id', flat=True)),
+        in_cart=set(ShoppingCart.objects.filter(
+            user=request.user, recipe__in=ids
+        ).values_list('recipe_id', flat=True)),
+        followed=FoodgramUserSerializer.get_followed_ids(request),
+    )
+
+
+def cached_response(request, get_response, pk=None):
+    """Возвращает ответ из кэша или строит и сохраняет его."""
+
+    if not is_cacheable(request):
+        return get_response()
+    key = cache_key(request, pk)
+    data = response_cache.get(key)
+    if data is not None:
+        count(HITS_KEY)
+        return Response(overlay_user_flags(data, request))
+    count(MISSES_KEY)
+    response = get_response()
+    if response.status_code == 200:
+        response_cache.set(key, set_user_flags(deepcopy(response.data)))
+    return response
@@ -1,41 +1,111 @@
-from django_filters import CharFilter, FilterSet, ModelMultipleChoiceFilter
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db.models import Exists, F, OuterRef, Q
+from django_filters import (CharFilter, ChoiceFilter, FilterSet,
+                            ModelMultipleChoiceFilter)
+from rest_framework import filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from foodgram.constants import RECIPE_ORDERINGS, SEARCH_CONFIG
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.search import full_text_search_enabled
 
 
 class RecipeFilter(FilterSet):
-    """Фильтр для рецептов."""
+    """Фильтр для рецептов.
+
+    Теги и ингредиенты проверяются подзапросами `EXISTS`, поэтому
+    выборка не размножается соединениями и не требует `DISTINCT`.
+    """
 
     tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
         to_field_name='slug',
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        method='get_tags'
+    )
+    ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='get_ingredients'
+    )
+    ingredients_mode = ChoiceFilter(
+        choices=(('all', 'all'), ('any', 'any')),
+        method='get_ingredients_mode'
+    )
+    exclude_ingredients = ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.all(),
+        method='get_exclude_ingredients'
     )
     is_favorited = CharFilter(method='get_favorite')
     is_in_shopping_cart = CharFilter(method='get_shopping')
+    ordering = ChoiceFilter(
+        choices=[(ordering, ordering) for ordering in RECIPE_ORDERINGS],
+        method='get_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('tags', 'author', 'ingredients', 'ingredients_mode',
+                  'exclude_ingredients', 'is_favorited', 'is_in_shopping_cart',
+                  'ordering')
+
+    @staticmethod
+    def with_ingredients(ingredients):
+        return Exists(RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk'), ingredient__in=ingredients
+        ))
+
+    def get_tags(self, queryset, name, value):
+        """Метод для фильтрации рецептов по любому из тегов."""
+
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tag__in=value
+        )))
+
+    def get_ingredients(self, queryset, name, value):
+        """Метод для фильтрации рецептов по ингредиентам.
+
+        По умолчанию рецепт должен содержать все ингредиенты, при
+        `ingredients_mode=any` — хотя бы один из них.
+        """
+
+        if not value:
+            return queryset
+        if self.form.cleaned_data.get('ingredients_mode') == 'any':
+            return queryset.filter(self.with_ingredients(value))
+        for ingredient in value:
+            queryset = queryset.filter(self.with_ingredients((ingredient,)))
+        return queryset
+
+    def get_ingredients_mode(self, queryset, name, value):
+        return queryset
+
+    def get_exclude_ingredients(self, queryset, name, value):
+        """Метод для исключения рецептов с ингредиентами."""
+
+        if not value:
+            return queryset
+        return queryset.filter(~self.with_ingredients(value))
 
     def get_favorite(self, queryset, name, value):
         """Метод для фильтрации рецептов по избранному."""
 
         if value and self.request.user.is_authenticated:
-            return queryset.filter(
-                favoriterecipe_recipe__user=self.request.user
-            )
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def get_shopping(self, queryset, name, value):
         """Метод для фильтрации рецептов в списке покупок."""
 
         if value and self.request.user.is_authenticated:
-            return queryset.filter(
-                shoppingcart_recipe__user=self.request.user
-            )
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
+    def get_ordering(self, queryset, name, value):
+        """Метод для сортировки рецептов по рейтингу."""
+
+        return queryset.ordered_by(value)
+
 
 class SearchIngredientFilter(FilterSet):
     """Фильтр для поиска ингредиентов."""
@@ -45,3 +115,32 @@ class SearchIngredientFilter(FilterSet):
     class Meta:
         model = Ingredient
         fields = ('name',)
+
+
+class RecipeSearchFilter(filters.SearchFilter):
+    """Полнотекстовый поиск рецептов.
+
+    В PostgreSQL ищет по поисковому вектору и по триграммам названия
+    и сортирует результаты по релевантности, в остальных СУБД
+    использует стандартный поиск по `search_fields`. Явно заданная
+    сортировка `ordering` имеет приоритет над релевантностью.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if not full_text_search_enabled():
+            return super().filter_queryset(request, queryset, view)
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+        query = SearchQuery(
+            terms, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        queryset = queryset.filter(
+            Q(search_vector=query) | Q(name__trigram_similar=terms)
+        )
+        if 'ordering' in request.query_params:
+            return queryset
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), query),
+            similarity=TrigramSimilarity('name', terms),
+        ).order_by('-rank', '-similarity', '-id')
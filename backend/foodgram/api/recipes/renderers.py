@@ -0,0 +1,87 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework import renderers
+
+
+class ShoppingCartRenderer(ABC, renderers.BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Строки списка отдаются генератором `stream`, чтобы ответ можно было
+    передавать клиенту по частям, не собирая файл целиком в памяти.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return ''.join(
+                f'{key}: {value}\n' for key, value in data.items()
+            ).encode(self.charset)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    @abstractmethod
+    def stream(self, rows):
+        """Возвращает строки списка покупок по одной."""
+
+
+class ShoppingCartTxtRenderer(ShoppingCartRenderer):
+    """Список покупок в виде текстового файла."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        for row in rows:
+            yield (f'{row["ingredient__name"]}, '
+                   f'{row["amount"]} - '
+                   f'{row["ingredient__measurement_unit"]}\n')
+
+
+class EchoBuffer:
+    """Буфер, возвращающий записанную строку вместо её хранения."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartCsvRenderer(ShoppingCartRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in rows:
+            yield writer.writerow((
+                row['ingredient__name'],
+                row['ingredient__measurement_unit'],
+                row['amount'],
+            ))
+
+
+class ShoppingCartJsonRenderer(ShoppingCartRenderer):
+    """Список покупок в формате JSON."""
+
+    media_type = 'application/json'
+    format = 'json'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return renderers.JSONRenderer().render(data)
+        return super().render(data, accepted_media_type, renderer_context)
+
+    def stream(self, rows):
+        separator = ''
+        yield '['
+        for row in rows:
+            yield separator + json.dumps({
+                'name': row['ingredient__name'],
+                'measurement_unit': row['ingredient__measurement_unit'],
+                'amount': row['amount'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
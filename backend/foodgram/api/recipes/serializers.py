@@ -1,11 +1,21 @@
 from django.db import transaction
+from django.db.models import prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from api.fields import (BulkPrimaryKeyRelatedField, ImagePlaceholderField,
+                        ImageRenditionsField)
 from api.users.serializers import FoodgramUserSerializer
-from foodgram.constants import MAX_VALUE, MIN_VALUE
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+from foodgram.constants import (AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT,
+                                BULK_MAX_ITEMS, COOKABLE_LIMIT,
+                                COOKABLE_MAX_LIMIT, MAX_VALUE, MIN_VALUE,
+                                SIMILAR_LIMIT, SIMILAR_MAX_LIMIT)
+from recipes.models import (FavoriteRecipe, Ingredient, PantryItem, Recipe,
+                            RecipeIngredient, RecipeQuerySet, ShoppingCart,
+                            Tag)
+from recipes.pantry_index import invalidate_pantry_index
+from recipes.search import update_search_vector
+from recipes.similarity import invalidate_similarity_index
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -24,12 +34,90 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
-class IngredientCreateSerializer(serializers.ModelSerializer):
-    """Сериализатор создания связи ингредиента с рецептом."""
+class IngredientAutocompleteSerializer(serializers.Serializer):
+    """Сериализатор параметров автодополнения ингредиентов."""
+
+    name = serializers.CharField(allow_blank=True, default='')
+    limit = serializers.IntegerField(
+        min_value=MIN_VALUE,
+        max_value=AUTOCOMPLETE_MAX_LIMIT,
+        default=AUTOCOMPLETE_LIMIT
+    )
+
+
+class PantryItemSerializer(serializers.ModelSerializer):
+    """Сериализатор продуктов в наличии."""
 
     id = serializers.PrimaryKeyRelatedField(
+        source='ingredient',
         queryset=Ingredient.objects.all()
     )
+    name = serializers.ReadOnlyField(
+        source='ingredient.name'
+    )
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = PantryItem
+        fields = ('id', 'name', 'measurement_unit')
+
+    def validate(self, attrs):
+        if PantryItem.objects.filter(
+            user=self.context['request'].user,
+            ingredient=attrs['ingredient']
+        ).exists():
+            raise serializers.ValidationError({
+                'error': 'Продукт уже добавлен'
+            })
+        return attrs
+
+
+class CookableParamsSerializer(serializers.Serializer):
+    """Сериализатор параметров подбора рецептов по продуктам."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_VALUE),
+        required=False
+    )
+    limit = serializers.IntegerField(
+        min_value=MIN_VALUE,
+        max_value=COOKABLE_MAX_LIMIT,
+        default=COOKABLE_LIMIT
+    )
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class SimilarParamsSerializer(serializers.Serializer):
+    """Сериализатор параметров подбора похожих рецептов."""
+
+    limit = serializers.IntegerField(
+        min_value=MIN_VALUE,
+        max_value=SIMILAR_MAX_LIMIT,
+        default=SIMILAR_LIMIT
+    )
+
+
+class IngredientCreateListSerializer(serializers.ListSerializer):
+    """Список ингредиентов рецепта, загружаемых одним запросом."""
+
+    def to_internal_value(self, data):
+        ingredients = super().to_internal_value(data)
+        instances = BulkPrimaryKeyRelatedField(
+            queryset=Ingredient.objects.all()
+        ).to_internal_values(
+            [ingredient['id'] for ingredient in ingredients]
+        )
+        for ingredient, instance in zip(ingredients, instances):
+            ingredient['id'] = instance
+        return ingredients
+
+
+class IngredientCreateSerializer(serializers.ModelSerializer):
+    """Сериализатор создания связи ингредиента с рецептом."""
+
+    id = serializers.IntegerField(min_value=MIN_VALUE)
     amount = serializers.IntegerField(
         min_value=MIN_VALUE,
         max_value=MAX_VALUE,
@@ -42,6 +130,7 @@ class IngredientCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = IngredientCreateListSerializer
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -73,6 +162,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField(default=False)
     is_in_shopping_cart = serializers.SerializerMethodField(default=False)
+    image_renditions = ImageRenditionsField()
+    image_placeholder = ImagePlaceholderField()
 
     class Meta:
         model = Recipe
@@ -85,11 +176,15 @@ class RecipeSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_renditions',
+            'image_placeholder',
             'text',
             'cooking_time'
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context['request']
         return (request
                 and request.user.is_authenticated
@@ -98,6 +193,8 @@ class RecipeSerializer(serializers.ModelSerializer):
                 ).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context['request']
         return (request
                 and request.user.is_authenticated
@@ -111,7 +208,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
 
     image = Base64ImageField(allow_null=False, allow_empty_file=False)
     ingredients = IngredientCreateSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -137,27 +234,29 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, attrs):
-        ingredients = attrs.get('ingredients')
-        if not ingredients:
-            raise serializers.ValidationError({
-                'error': 'Необходимо добавить ингредиенты'
-            })
-        ingredient_list = [
-            ingrediend['id'] for ingrediend in ingredients
-        ]
-        if len(set(ingredient_list)) != len(ingredient_list):
-            raise serializers.ValidationError({
-                'error': 'Ингредиенты не должны повторяться'
-            })
-        tags = attrs.get('tags')
-        if not tags:
-            raise serializers.ValidationError({
-                'error': 'Необходимо добавить теги'
-            })
-        if len(set(tags)) != len(tags):
-            raise serializers.ValidationError({
-                'error': 'Теги не должны повторяться'
-            })
+        if not self.partial or 'ingredients' in attrs:
+            ingredients = attrs.get('ingredients')
+            if not ingredients:
+                raise serializers.ValidationError({
+                    'error': 'Необходимо добавить ингредиенты'
+                })
+            ingredient_list = [
+                ingrediend['id'] for ingrediend in ingredients
+            ]
+            if len(set(ingredient_list)) != len(ingredient_list):
+                raise serializers.ValidationError({
+                    'error': 'Ингредиенты не должны повторяться'
+                })
+        if not self.partial or 'tags' in attrs:
+            tags = attrs.get('tags')
+            if not tags:
+                raise serializers.ValidationError({
+                    'error': 'Необходимо добавить теги'
+                })
+            if len(set(tags)) != len(tags):
+                raise serializers.ValidationError({
+                    'error': 'Теги не должны повторяться'
+                })
         return attrs
 
     @staticmethod
@@ -169,6 +268,56 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ) for ingredient_data in ingredients]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    def update_ingredients(self, recipe, ingredients):
+        """Приводит состав рецепта к новому списку ингредиентов.
+
+        Меняются только отличающиеся строки: количества обновляются,
+        новые ингредиенты добавляются, лишние удаляются. Возвращает
+        True, если состав изменился.
+        """
+
+        rows = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=recipe)
+        }
+        old_amounts = {
+            ingredient_id: row.amount for ingredient_id, row in rows.items()
+        }
+        new_amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        if old_amounts == new_amounts:
+            return False
+        changed = []
+        for ingredient_id, row in rows.items():
+            amount = new_amounts.get(ingredient_id, row.amount)
+            if amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        removed = old_amounts.keys() - new_amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient__in=removed
+            ).delete()
+        self.create_ingredients(recipe, [
+            ingredient for ingredient in ingredients
+            if ingredient['id'].id not in rows
+        ])
+        return True
+
+    @staticmethod
+    def update_tags(recipe, tags):
+        """Обновляет теги рецепта, если они изменились."""
+
+        if set(recipe.tags.values_list('id', flat=True)) == {
+            tag.id for tag in tags
+        }:
+            return False
+        recipe.tags.set(tags)
+        return True
+
     @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
@@ -177,34 +326,95 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                                        **validated_data)
         self.create_ingredients(recipe, ingredients)
         recipe.tags.set(tags)
+        update_search_vector(recipe.id)
+        invalidate_similarity_index()
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        self.create_ingredients(recipe=instance, ingredients=ingredients)
-        instance.tags.set(tags)
-        return super().update(instance, validated_data)
+        """Обновляет рецепт, не трогая неизменившиеся связи.
+
+        Ингредиенты и теги, не переданные в PATCH, остаются прежними.
+        Поисковый вектор и индексы рецептов пересчитываются только при
+        изменении влияющих на них данных.
+        """
+
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        ingredients_changed = (
+            ingredients is not None
+            and self.update_ingredients(instance, ingredients)
+        )
+        if ingredients_changed:
+            invalidate_pantry_index()
+        tags_changed = tags is not None and self.update_tags(instance, tags)
+        text_changed = any(
+            validated_data[field] != getattr(instance, field)
+            for field in ('name', 'text') if field in validated_data
+        )
+        instance = super().update(instance, validated_data)
+        if ingredients_changed or text_changed:
+            update_search_vector(instance.id)
+        if ingredients_changed or tags_changed:
+            invalidate_similarity_index()
+        return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], *RecipeQuerySet.related_lookups()
+        )
         return RecipeSerializer(instance=instance, context=self.context).data
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для короткого отображения рецептов."""
 
+    image_renditions = ImageRenditionsField()
+    image_placeholder = ImagePlaceholderField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_renditions',
+            'image_placeholder',
             'cooking_time'
         )
 
 
+class RecipeMatchSerializer(RecipeShortSerializer):
+    """Сериализатор рецептов, подобранных по продуктам в наличии."""
+
+    coverage = serializers.FloatField(read_only=True)
+    missing_count = serializers.SerializerMethodField()
+    missing_ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta(RecipeShortSerializer.Meta):
+        fields = RecipeShortSerializer.Meta.fields + (
+            'coverage',
+            'missing_count',
+            'missing_ingredients'
+        )
+
+    def get_missing_count(self, obj):
+        return len(obj.missing_ingredients)
+
+
+class BulkRecipesSerializer(serializers.Serializer):
+    """Сериализатор списка рецептов для пакетных операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_VALUE),
+        allow_empty=False,
+        max_length=BULK_MAX_ITEMS
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
+
+
 class RecipeUserSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения рецептов."""
 
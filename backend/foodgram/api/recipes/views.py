@@ -1,39 +1,126 @@
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Max
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, permissions, status, viewsets
+from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
-from api.paginations import PageLimitPaginator
-from api.recipes.filters import RecipeFilter, SearchIngredientFilter
+from api.conditional import (ConditionalReadMixin, conditional_response,
+                             make_etag)
+from api.negotiation import ClientOrderContentNegotiation
+from api.paginations import CursorLimitPaginator, OptionalCursorPaginator
+from api.recipes.cache import cache_stats, cached_response
+from api.recipes.filters import (RecipeFilter, RecipeSearchFilter,
+                                 SearchIngredientFilter)
 from api.recipes.permissions import IsAuthorOrReadOnly
-from api.recipes.serializers import (FavoriteRecipeSerializer,
+from api.recipes.renderers import (ShoppingCartCsvRenderer,
+                                   ShoppingCartJsonRenderer,
+                                   ShoppingCartTxtRenderer)
+from api.recipes.serializers import (BulkRecipesSerializer,
+                                     CookableParamsSerializer,
+                                     FavoriteRecipeSerializer,
+                                     IngredientAutocompleteSerializer,
                                      IngredientSerializer,
-                                     RecipeCreateSerializer, RecipeSerializer,
-                                     ShoppingCartSerializer, TagSerializer)
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart, Tag)
+                                     PantryItemSerializer,
+                                     RecipeCreateSerializer,
+                                     RecipeMatchSerializer, RecipeSerializer,
+                                     ShoppingCartSerializer,
+                                     SimilarParamsSerializer, TagSerializer)
+from api.snapshots import snapshot_response
+from api.users.serializers import FoodgramUserSerializer
+from foodgram.constants import RECIPE_ORDERINGS
+from recipes.bulk import insert_new
+from recipes.counters import shift_counters
+from recipes.feed import feed_filter
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (FavoriteRecipe, Ingredient, PantryItem, Recipe,
+                            ShoppingCart, Tag)
+from recipes.pantry_index import pantry_index
+from recipes.shopping_cart import get_cart_totals
+from recipes.similarity import similarity_index
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Представление рецептов."""
 
-    queryset = Recipe.objects.select_related('author').prefetch_related(
-        'tags', 'ingredients'
-    )
+    queryset = Recipe.objects.with_related()
     permission_classes = (IsAuthorOrReadOnly,)
-    pagination_class = PageLimitPaginator
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    pagination_class = OptionalCursorPaginator
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = RecipeFilter
     filterset_fields = ('name', 'author')
-    search_fields = ('name',)
+    search_fields = ('name', 'text', 'ingredients__name')
+
+    @property
+    def cursor_ordering(self):
+        ordering = self.request.query_params.get('ordering')
+        if ordering is None and self.request.query_params.get(
+            RecipeSearchFilter.search_param
+        ):
+            # Результаты поиска сортируются по релевантности, по которой
+            # курсор построить нельзя.
+            raise ValidationError({'cursor': (
+                'Курсор с поиском требует явной сортировки ordering.'
+            )})
+        return RECIPE_ORDERINGS.get(ordering, Recipe._meta.ordering)
+
+    def get_queryset(self):
+        return super().get_queryset().with_user_flags(self.request.user)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, lambda: super(RecipeViewSet, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def cached_retrieve(self, request, **kwargs):
+        return cached_response(
+            request,
+            lambda: super(RecipeViewSet, self).retrieve(request, **kwargs),
+            pk=kwargs['pk']
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        fields = ['updated_at', 'tags_updated_at', 'ingredients_updated_at',
+                  'author_id', 'author__username', 'author__email',
+                  'author__first_name', 'author__last_name']
+        if request.user.is_authenticated:
+            fields += ['is_favorited', 'is_in_shopping_cart']
+        state = get_object_or_404(
+            Recipe.objects.with_user_flags(request.user).annotate(
+                tags_updated_at=Max('tags__updated_at'),
+                ingredients_updated_at=Max('ingredients__updated_at'),
+            ).values(*fields),
+            pk=kwargs['pk']
+        )
+        if not request.user.is_authenticated:
+            return conditional_response(
+                request,
+                lambda: self.cached_retrieve(request, **kwargs),
+                make_etag(*state.values()),
+                max(filter(None, (state['updated_at'],
+                                  state['tags_updated_at'],
+                                  state['ingredients_updated_at']))),
+            )
+        is_subscribed = (
+            state['author_id']
+            in FoodgramUserSerializer.get_followed_ids(request)
+        )
+        return conditional_response(
+            request,
+            lambda: self.cached_retrieve(request, **kwargs),
+            make_etag(request.user.id, is_subscribed, *state.values()),
+        )
+
     @staticmethod
     def object_create(serualizer, request, pk):
         data = {
@@ -47,6 +134,135 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serualizer.save()
         return Response(serualizer.data, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    @transaction.atomic
+    def bulk_change(model, request, counter):
+        """Добавляет или удаляет несколько рецептов одним запросом.
+
+        Вставка выполняется через `bulk_create`, который не вызывает
+        сигналы, поэтому счётчик рецептов сдвигается здесь только для
+        действительно вставленных строк. Удаление идёт одним запросом
+        по заблокированным строкам и обрабатывается сигналами.
+        """
+
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        found = set(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('id', flat=True))
+        links = model.objects.filter(user=request.user)
+        if request.method == 'POST':
+            linked = set(links.filter(
+                recipe__in=found
+            ).values_list('recipe_id', flat=True))
+            changed = insert_new(
+                links, 'recipe_id', found - linked, user=request.user
+            )
+            shift_counters(Recipe, changed, counter, 1)
+            done, skipped = 'created', 'exists'
+        else:
+            changed = set(links.filter(
+                recipe__in=found
+            ).select_for_update().values_list('recipe_id', flat=True))
+            links.filter(recipe__in=changed).delete()
+            done, skipped = 'deleted', 'missing'
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': (done if recipe_id in changed
+                           else skipped if recipe_id in found
+                           else 'not_found'),
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=(permissions.IsAdminUser,))
+    def cache_stats(self, request):
+        return Response(cache_stats())
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=(permissions.IsAuthenticated,))
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь."""
+
+        paginator = CursorLimitPaginator()
+        page = paginator.paginate_queryset(
+            self.get_queryset().filter(feed_filter(request.user)),
+            request,
+            self
+        )
+        return paginator.get_paginated_response(RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(methods=['GET'], detail=False)
+    def cookable(self, request):
+        """Подбирает рецепты по продуктам в наличии.
+
+        Продукты берутся из параметра `ingredients`, а если он не
+        передан, из списка продуктов пользователя.
+        """
+
+        params = CookableParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ingredient_ids = params.validated_data.get('ingredients')
+        if ingredient_ids is None:
+            if not request.user.is_authenticated:
+                self.permission_denied(request)
+            ingredient_ids = PantryItem.objects.filter(
+                user=request.user
+            ).values_list('ingredient_id', flat=True)
+        matches = pantry_index.match(
+            ingredient_ids,
+            params.validated_data['limit'],
+            params.validated_data.get('max_missing')
+        )
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        ingredients = Ingredient.objects.in_bulk({
+            ingredient_id
+            for _, _, missing in matches for ingredient_id in missing
+        })
+        found = []
+        for recipe_id, coverage, missing in matches:
+            if recipe_id not in recipes:
+                continue
+            recipe = recipes[recipe_id]
+            recipe.coverage = coverage
+            recipe.missing_ingredients = [
+                ingredients[ingredient_id] for ingredient_id in missing
+                if ingredient_id in ingredients
+            ]
+            found.append(recipe)
+        return Response(RecipeMatchSerializer(
+            found, many=True, context=self.get_serializer_context()
+        ).data)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk):
+        """Возвращает рецепты с похожими ингредиентами и тегами."""
+
+        params = SimilarParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        recipe_id = get_object_or_404(
+            Recipe.objects.values_list('id', flat=True), pk=pk
+        )
+        similar_ids = similarity_index.similar(
+            recipe_id, params.validated_data['limit']
+        )
+        recipes = self.get_queryset().in_bulk(similar_ids)
+        return Response(RecipeSerializer(
+            [recipes[similar_id] for similar_id in similar_ids
+             if similar_id in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        ).data)
+
     @action(methods=['POST'],
             detail=True,
             permission_classes=(permissions.IsAuthenticated,))
@@ -83,32 +299,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
-    @action(methods=['GET'],
+    @action(methods=['POST', 'DELETE'],
             detail=False,
+            url_path='favorite',
+            url_name='bulk-favorite',
             permission_classes=(permissions.IsAuthenticated,))
+    def bulk_favorite(self, request):
+        return self.bulk_change(FavoriteRecipe, request, 'favorites_count')
+
+    @action(methods=['POST', 'DELETE'],
+            detail=False,
+            url_path='shopping_cart',
+            url_name='bulk-shopping-cart',
+            permission_classes=(permissions.IsAuthenticated,))
+    def bulk_shopping_cart(self, request):
+        return self.bulk_change(ShoppingCart, request, 'in_carts_count')
+
+    @action(methods=['GET'],
+            detail=False,
+            permission_classes=(permissions.IsAuthenticated,),
+            renderer_classes=(ShoppingCartTxtRenderer,
+                              ShoppingCartCsvRenderer,
+                              ShoppingCartJsonRenderer),
+            content_negotiation_class=ClientOrderContentNegotiation)
     def download_shopping_cart(self, request):
-        data = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values('ingredient__name', 'ingredient__measurement_unit',).annotate(
-            amount=Sum('amount')
-        ).order_by('ingredient__name')
-        output = ''
-        for ingredient in data:
-            output += (f'{ingredient["ingredient__name"]}, '
-                       f'{ingredient["amount"]} - '
-                       f'{ingredient["measurement_unit"]}\n')
-        return FileResponse(
-            output.encode('utf-8'),
-            as_attachment=True,
-            filename='shopping_cart.txt'
-        )
-
-
-class ReadListViewSet(viewsets.ReadOnlyModelViewSet):
+        totals = get_cart_totals(request.user.id)
+        ingredients = (
+            {
+                'ingredient__name': ingredient['name'],
+                'ingredient__measurement_unit': ingredient['measurement_unit'],
+                'amount': totals[ingredient['id']],
+            }
+            for ingredient in Ingredient.objects.filter(
+                id__in=totals
+            ).order_by('name').values(
+                'id', 'name', 'measurement_unit'
+            ).iterator()
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_cart.{renderer.format}"'
+        )
+        return response
+
+
+class PantryViewSet(mixins.ListModelMixin,
+                    mixins.CreateModelMixin,
+                    mixins.DestroyModelMixin,
+                    viewsets.GenericViewSet):
+    """Представление продуктов в наличии у пользователя."""
+
+    serializer_class = PantryItemSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = None
+    lookup_field = 'ingredient'
+
+    def get_queryset(self):
+        return PantryItem.objects.filter(
+            user=self.request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class ReadListViewSet(ConditionalReadMixin, viewsets.ReadOnlyModelViewSet):
     """Миксин для тегов и ингредиентов."""
 
     pagination_class = None
     permission_classes = (permissions.AllowAny,)
+    snapshot_name = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return snapshot_response(request, self.snapshot_name)
 
 
 class TagViewSet(ReadListViewSet):
@@ -116,6 +385,7 @@ class TagViewSet(ReadListViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    snapshot_name = 'tags'
 
 
 class IngredientViewSet(ReadListViewSet):
@@ -123,6 +393,13 @@ class IngredientViewSet(ReadListViewSet):
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    snapshot_name = 'ingredients'
     filterset_class = SearchIngredientFilter
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ('name',)
+
+    @action(methods=['GET'], detail=False, filter_backends=())
+    def autocomplete(self, request):
+        params = IngredientAutocompleteSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(ingredient_index.search(**params.validated_data))
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.recipes.cache import invalidate_recipe_cache
+from api.snapshots import refresh_snapshot
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def recipe_data_changed(**kwargs):
+    """Сбрасывает кэш ответов при изменении данных рецептов."""
+
+    invalidate_recipe_cache()
+
+
+@receiver((post_save, post_delete), sender=User)
+def author_changed(update_fields=None, **kwargs):
+    """Сбрасывает кэш ответов при изменении данных автора."""
+
+    if update_fields != frozenset(('last_login',)):
+        invalidate_recipe_cache()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    refresh_snapshot('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    refresh_snapshot('ingredients')
@@ -0,0 +1,106 @@
+"""Готовые JSON-снимки списков тегов и ингредиентов.
+
+Снимки записываются в `MEDIA_ROOT/snapshots/` (JSON и сжатая gzip-копия
+для `gzip_static` в nginx) и держатся в памяти процесса вместе с
+версией — хэшем содержимого. Процесс перечитывает снимок, когда файл
+на диске был перезаписан.
+"""
+import gzip
+import os
+from hashlib import md5
+from pathlib import Path
+from threading import Lock
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework.renderers import JSONRenderer
+
+from api.recipes.serializers import IngredientSerializer, TagSerializer
+from recipes.models import Ingredient, Tag
+from recipes.transactions import on_commit_once
+
+SNAPSHOTS = {
+    'tags': (Tag, TagSerializer),
+    'ingredients': (Ingredient, IngredientSerializer),
+}
+
+loaded = {}
+lock = Lock()
+
+
+def snapshot_path(name):
+    return Path(settings.MEDIA_ROOT, 'snapshots', f'{name}.json')
+
+
+def replace_file(path, content):
+    temporary = path.with_name(f'.{path.name}.tmp')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def write_snapshot(name):
+    """Сериализует таблицу целиком и перезаписывает файлы снимка."""
+
+    model, serializer = SNAPSHOTS[name]
+    body = JSONRenderer().render(
+        serializer(model.objects.order_by('id'), many=True).data
+    )
+    path = snapshot_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    replace_file(path.with_name(f'{path.name}.gz'),
+                 gzip.compress(body, mtime=0))
+    replace_file(path, body)
+
+
+def write_snapshots(names):
+    for name in names:
+        write_snapshot(name)
+
+
+def refresh_snapshot(name):
+    """Перезаписывает снимок один раз после фиксации транзакции."""
+
+    on_commit_once(write_snapshots, name)
+
+
+def load_snapshot(name):
+    """Возвращает версию, JSON и gzip-копию снимка."""
+
+    path = snapshot_path(name)
+    with lock:
+        try:
+            modified = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            write_snapshot(name)
+            modified = path.stat().st_mtime_ns
+        if name not in loaded or loaded[name][0] != modified:
+            body = path.read_bytes()
+            loaded[name] = (
+                modified,
+                md5(body, usedforsecurity=False).hexdigest(),
+                body,
+                gzip.compress(body, mtime=0),
+            )
+        return loaded[name][1:]
+
+
+def snapshot_response(request, name):
+    """Отдаёт снимок без сериализации, с ETag по версии."""
+
+    version, body, compressed = load_snapshot(name)
+    etag = quote_etag(version)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            response = HttpResponse(
+                compressed, content_type='application/json'
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['X-Snapshot-Version'] = version
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,413 @@
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from api.recipes.cache import VERSION_KEY, response_cache
+from recipes.models import (FavoriteRecipe, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredient, RecipeScore, ShoppingCart, Tag,
+                            User)
+from users.models import Follow
+
+RECIPES_COUNT = 8
+
+
+class RecipeListQueriesTests(APITestCase):
+    """Число запросов к базе при выдаче списка рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='password'
+        )
+        Follow.objects.create(follower=cls.reader, following=cls.author)
+        tags = [
+            Tag.objects.create(name=f'тег {number}', slug=f'tag{number}',
+                               color=f'#00000{number}')
+            for number in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'продукт {number}',
+                                      measurement_unit='г')
+            for number in range(5)
+        ]
+        for number in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f'рецепт {number}', text='текст',
+                cooking_time=10, image='recipes/images/recipe.png'
+            )
+            recipe.tags.set(tags[:number % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=number + 1)
+                for ingredient in ingredients[:number % 5 + 1]
+            )
+
+    def assert_list_queries(self, queries):
+        for limit in (1, RECIPES_COUNT):
+            with self.subTest(limit=limit):
+                for cache in caches.all():
+                    cache.clear()
+                with self.assertNumQueries(queries):
+                    response = self.client.get(
+                        '/api/recipes/', {'limit': limit}
+                    )
+                self.assertEqual(len(response.data['results']), limit)
+
+    # Один из запросов читает версию данных для ключа кэша ответов.
+    def test_anonymous_list_queries(self):
+        self.assert_list_queries(5)
+
+    def test_authenticated_list_queries(self):
+        self.client.force_authenticate(self.reader)
+        self.assert_list_queries(6)
+
+    def test_cursor_keeps_recipes_without_score(self):
+        RecipeScore.objects.filter(recipe__name='рецепт 0').delete()
+        RecipeScore.objects.filter(recipe__name='рецепт 1').update(popular=1)
+        found = []
+        url, params = '/api/recipes/', {'ordering': 'popular', 'cursor': '',
+                                        'limit': 3}
+        while url:
+            response = self.client.get(url, params)
+            found += [recipe['name'] for recipe in response.data['results']]
+            url, params = response.data['next'], None
+        self.assertEqual(found[0], 'рецепт 1')
+        self.assertEqual(found[-1], 'рецепт 0')
+        self.assertEqual(len(found), RECIPES_COUNT)
+
+    def test_cursor_with_search_requires_ordering(self):
+        response = self.client.get(
+            '/api/recipes/', {'search': 'рецепт', 'cursor': ''}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            '/api/recipes/', {'search': 'рецепт', 'cursor': '',
+                              'ordering': 'new'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class RecipeResponseCacheTests(APITestCase):
+    """Сброс кэша ответов при изменениях в базе."""
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='суп', text='суп', cooking_time=1,
+            image='recipes/images/soup.png'
+        )
+
+    def get_name(self):
+        return self.client.get(
+            f'/api/recipes/{self.recipe.id}/'
+        ).data['name']
+
+    def test_sees_changes_made_outside_process(self):
+        self.assertEqual(self.get_name(), 'суп')
+        # Другой процесс меняет только базу данных, не вызывая сигналы.
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            name='борщ', updated_at=timezone.now()
+        )
+        self.assertEqual(self.get_name(), 'суп')
+        # Срок доверия к версии истёк.
+        response_cache.delete(VERSION_KEY)
+        self.assertEqual(self.get_name(), 'борщ')
+
+
+class ShoppingCartDownloadTests(APITestCase):
+    """Выбор формата списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        recipe = Recipe.objects.create(
+            author=cls.user, name='суп', text='суп', cooking_time=1,
+            image='recipes/images/soup.png'
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, amount=7,
+            ingredient=Ingredient.objects.create(
+                name='соль', measurement_unit='г'
+            )
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_accept_order(self):
+        for accept, media_type in (
+            (None, 'text/plain'),
+            ('*/*', 'text/plain'),
+            ('application/json, text/plain, */*', 'application/json'),
+            ('text/csv;q=0.5, application/json;q=0.9', 'application/json'),
+            ('text/plain;q=0, */*', 'text/csv'),
+        ):
+            with self.subTest(accept=accept):
+                headers = {'HTTP_ACCEPT': accept} if accept else {}
+                response = self.client.get(
+                    '/api/recipes/download_shopping_cart/', **headers
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response['Content-Type'].split(';')[0], media_type
+                )
+
+    def test_format_overrides_accept(self):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'csv'},
+            HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response['Content-Type'].split(';')[0], 'text/csv')
+
+    def test_unknown_format_not_acceptable(self):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/', {'format': 'pdf'}
+        )
+        self.assertEqual(response.status_code, 406)
+
+
+class BulkEndpointsTests(APITestCase):
+    """Пакетные операции и денормализованные счётчики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.soup, cls.salad = (
+            Recipe.objects.create(
+                author=cls.author, name=name, text=name, cooking_time=1,
+                image='recipes/images/recipe.png'
+            )
+            for name in ('суп', 'салат')
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, response):
+        return [result['status'] for result in response.data['results']]
+
+    def test_bulk_favorite(self):
+        FavoriteRecipe.objects.create(user=self.user, recipe=self.soup)
+        response = self.client.post(
+            '/api/recipes/favorite/',
+            {'recipes': [self.soup.id, self.salad.id, 0xffff]}, format='json'
+        )
+        self.assertEqual(
+            self.statuses(response), ['exists', 'created', 'not_found']
+        )
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'favorites_count', flat=True
+            )), [1, 1]
+        )
+        response = self.client.delete(
+            '/api/recipes/favorite/',
+            {'recipes': [self.salad.id, self.salad.id]}, format='json'
+        )
+        self.assertEqual(self.statuses(response), ['deleted'])
+        self.salad.refresh_from_db()
+        self.assertEqual(self.salad.favorites_count, 0)
+
+    def test_bulk_subscribe(self):
+        response = self.client.post(
+            '/api/users/subscribe/',
+            {'authors': [self.author.id, self.user.id, 0xffff]},
+            format='json'
+        )
+        self.assertEqual(
+            self.statuses(response), ['created', 'self', 'not_found']
+        )
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(
+            set(FeedEntry.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )), {self.soup.id, self.salad.id}
+        )
+        response = self.client.delete(
+            '/api/users/subscribe/', {'authors': [self.author.id]},
+            format='json'
+        )
+        self.assertEqual(self.statuses(response), ['deleted'])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+
+
+class RecipeUpdateTests(APITestCase):
+    """Изменение рецепта и проверка связанных id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.lunch, cls.dinner = (
+            Tag.objects.create(name=name, slug=slug, color=color)
+            for name, slug, color in (('обед', 'lunch', '#000001'),
+                                      ('ужин', 'dinner', '#000002'))
+        )
+        cls.salt, cls.egg = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'яйцо')
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.author)
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='омлет', text='омлет', cooking_time=5,
+            image='recipes/images/omelette.png'
+        )
+        self.recipe.tags.set((self.lunch,))
+        self.rows = {
+            row.ingredient_id: row.pk
+            for row in RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=self.recipe, ingredient=ingredient,
+                                 amount=amount)
+                for ingredient, amount in ((self.salt, 1), (self.egg, 3))
+            )
+        }
+
+    def patch(self, data):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.id}/', data, format='json'
+        )
+
+    def composition(self):
+        return {
+            row.ingredient_id: (row.pk, row.amount)
+            for row in RecipeIngredient.objects.filter(recipe=self.recipe)
+        }
+
+    def test_patch_keeps_omitted_relations(self):
+        response = self.patch({'name': 'яичница'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.composition(), {
+            self.salt.id: (self.rows[self.salt.id], 1),
+            self.egg.id: (self.rows[self.egg.id], 3),
+        })
+        self.assertEqual(
+            list(self.recipe.tags.values_list('id', flat=True)),
+            [self.lunch.id]
+        )
+
+    def test_patch_changes_only_differing_rows(self):
+        response = self.patch({
+            'ingredients': [{'id': self.egg.id, 'amount': 4}],
+            'tags': [self.lunch.id, self.dinner.id],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.composition(), {self.egg.id: (self.rows[self.egg.id], 4)}
+        )
+        self.assertEqual(
+            set(self.recipe.tags.values_list('id', flat=True)),
+            {self.lunch.id, self.dinner.id}
+        )
+
+    def test_unknown_ids_reported_together(self):
+        for data, field in (
+            ({'tags': [self.lunch.id, 9998, 9999]}, 'tags'),
+            ({'ingredients': [{'id': 9998, 'amount': 1},
+                              {'id': self.egg.id, 'amount': 1},
+                              {'id': 9999, 'amount': 1}]}, 'ingredients'),
+        ):
+            with self.subTest(field=field):
+                response = self.patch(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('9998, 9999', str(response.data[field]))
+        self.assertEqual(len(self.composition()), 2)
+
+
+class SubscriptionsTests(APITestCase):
+    """Список подписок с последними рецептами авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='password'
+        )
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        Follow.objects.create(follower=cls.reader, following=author)
+        for number in range(3):
+            Recipe.objects.create(
+                author=author, name=f'рецепт {number}', text='текст',
+                cooking_time=1, image='recipes/images/recipe.png'
+            )
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def get(self, recipes_limit):
+        return self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': recipes_limit}
+        )
+
+    def test_recipes_limit(self):
+        response = self.get(2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['name']
+             for recipe in response.data['results'][0]['recipes']],
+            ['рецепт 2', 'рецепт 1']
+        )
+
+    def test_invalid_recipes_limit(self):
+        for recipes_limit in (-1, 'abc'):
+            with self.subTest(recipes_limit=recipes_limit):
+                response = self.get(recipes_limit)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.data)
+
+
+class ConditionalGetTests(APITestCase):
+    """Ответы 304 на условные GET-запросы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            author=User.objects.create_user(
+                username='author', email='author@example.com',
+                password='password'
+            ),
+            name='суп', text='суп', cooking_time=1,
+            image='recipes/images/soup.png'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+
+    def test_not_modified(self):
+        for url, obj in (
+            (f'/api/recipes/{self.recipe.id}/', self.recipe),
+            (f'/api/ingredients/{self.ingredient.id}/', self.ingredient),
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                obj.name += '!'
+                obj.save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
@@ -1,5 +1,8 @@
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
+from api.fields import ImagePlaceholderField, ImageRenditionsField
+from foodgram.constants import BULK_MAX_ITEMS, MIN_VALUE
 from recipes.models import Recipe, User
 from users.models import Follow
 
@@ -7,12 +10,17 @@ from users.models import Follow
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для короткого отображения рецептов."""
 
+    image_renditions = ImageRenditionsField()
+    image_placeholder = ImagePlaceholderField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_renditions',
+            'image_placeholder',
             'cooking_time'
         )
 
@@ -34,17 +42,42 @@ class FoodgramUserSerializer(serializers.ModelSerializer):
         )
         extra_kwargs = {'password': {'write_only': True}}
 
+    @staticmethod
+    def get_followed_ids(request):
+        """Возвращает id авторов, на которых подписан пользователь.
+
+        Множество загружается одним запросом и кэшируется на объекте
+        запроса, поэтому все вложенные сериализаторы его переиспользуют.
+        """
+
+        if not hasattr(request, '_followed_ids'):
+            request._followed_ids = set(Follow.objects.filter(
+                follower=request.user
+            ).values_list('following_id', flat=True))
+        return request._followed_ids
+
     def get_is_subscribed(self, obj):
-        request = self.context['request']
-        return (request
-                and request.user.is_authenticated
-                and obj.following.filter(
-                    follower=request.user
-                ).exists())
+        request = self.context.get('request')
+        return bool(request
+                    and request.user.is_authenticated
+                    and obj.id in self.get_followed_ids(request))
+
+
+class RecipesLimitSerializer(serializers.Serializer):
+    """Сериализатор параметра количества рецептов в подписках."""
+
+    recipes_limit = serializers.IntegerField(
+        min_value=0, required=False, allow_null=True
+    )
 
 
 class FollowSerializer(FoodgramUserSerializer):
-    """Сериализатор для списка подписок."""
+    """Сериализатор для списка подписок.
+
+    Последние рецепты авторов подгружаются методом `prefetch_recipes`
+    одним запросом на всю страницу, а ограничение `recipes_limit`
+    передаётся в контексте уже проверенным.
+    """
 
     recipes = serializers.SerializerMethodField()
     recipes_count = serializers.IntegerField(default=0)
@@ -55,23 +88,45 @@ class FollowSerializer(FoodgramUserSerializer):
                   + ('recipes', 'recipes_count'))
         read_only_fields = ('username', 'email', 'first_name', 'last_name')
 
+    def get_is_subscribed(self, obj):
+        return True
+
+    @staticmethod
+    def prefetch_recipes(users, limit=None):
+        """Подгружает последние рецепты авторов одним запросом."""
+
+        recipes = Recipe.objects.order_by('-id')
+        if limit is not None:
+            recipes = recipes[:limit]
+        prefetch_related_objects(users, Prefetch(
+            'recipes', queryset=recipes, to_attr='recipes_preview'
+        ))
+
     def get_recipes(self, obj):
-        recipes = obj.recipes.all()
-        limit = self.context['request'].query_params['recipes_limit']
-        if limit:
-            try:
-                recipes = recipes[:int(limit)]
-            except ValueError:
-                raise serializers.ValidationError({
-                    'error': 'recipes_limit должен быть числом'
-                })
+        if not hasattr(obj, 'recipes_preview'):
+            self.prefetch_recipes(
+                [obj], self.context.get('recipes_limit')
+            )
         return RecipeShortSerializer(
-            recipes,
+            obj.recipes_preview,
             many=True,
             context=self.context
         ).data
 
 
+class BulkAuthorsSerializer(serializers.Serializer):
+    """Сериализатор списка авторов для пакетной подписки."""
+
+    authors = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_VALUE),
+        allow_empty=False,
+        max_length=BULK_MAX_ITEMS
+    )
+
+    def validate_authors(self, value):
+        return list(dict.fromkeys(value))
+
+
 class SubscribeSerializer(serializers.ModelSerializer):
     """Сериализатор для подписки."""
 
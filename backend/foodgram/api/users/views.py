@@ -1,11 +1,15 @@
-from django.db.models import Count
+from django.db import transaction
 from djoser.views import UserViewSet
 from rest_framework import permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from api.paginations import PageLimitPaginator
-from api.users.serializers import FollowSerializer, SubscribeSerializer
+from api.paginations import OptionalCursorPaginator
+from api.users.serializers import (BulkAuthorsSerializer, FollowSerializer,
+                                   RecipesLimitSerializer, SubscribeSerializer)
+from recipes.bulk import insert_new
+from recipes.counters import shift_counters
+from recipes.feed import backfill_feed
 from recipes.models import User
 from users.models import Follow
 
@@ -13,7 +17,13 @@ from users.models import Follow
 class FoodgramUserViewSet(UserViewSet):
     """Представление пользователя."""
 
-    pagination_class = PageLimitPaginator
+    pagination_class = OptionalCursorPaginator
+    cursor_ordering = ('username', 'id')
+
+    def get_recipes_limit(self):
+        params = RecipesLimitSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return params.validated_data.get('recipes_limit')
 
     def get_permissions(self):
         if self.action == 'me':
@@ -29,7 +39,8 @@ class FoodgramUserViewSet(UserViewSet):
             'following': kwargs['id'],
         }
         serializer = SubscribeSerializer(
-            context={'request': request},
+            context={'request': request,
+                     'recipes_limit': self.get_recipes_limit()},
             data=data
         )
         serializer.is_valid(raise_exception=True)
@@ -46,16 +57,67 @@ class FoodgramUserViewSet(UserViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response('Вы не подписаны', status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=('POST', 'DELETE'),
+            detail=False,
+            url_path='subscribe',
+            url_name='bulk-subscribe',
+            permission_classes=(permissions.IsAuthenticated,))
+    @transaction.atomic
+    def bulk_subscribe(self, request):
+        """Подписывает на нескольких авторов или отписывает от них.
+
+        `bulk_create` не вызывает сигналы, поэтому счётчики подписчиков
+        и ленты при подписке обновляются здесь только для действительно
+        вставленных подписок, а при отписке — сигналами.
+        """
+
+        serializer = BulkAuthorsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        author_ids = serializer.validated_data['authors']
+        found = set(User.objects.filter(
+            pk__in=author_ids
+        ).values_list('id', flat=True))
+        follows = Follow.objects.filter(follower=request.user)
+        if request.method == 'POST':
+            followed = set(follows.filter(
+                following__in=found
+            ).values_list('following_id', flat=True))
+            changed = insert_new(
+                follows, 'following_id',
+                found - followed - {request.user.id},
+                follower=request.user
+            )
+            shift_counters(User, changed, 'followers_count', 1)
+            backfill_feed(request.user.id, *changed)
+            done, skipped = 'created', 'exists'
+        else:
+            changed = set(follows.filter(
+                following__in=found
+            ).select_for_update().values_list('following_id', flat=True))
+            follows.filter(following__in=changed).delete()
+            done, skipped = 'deleted', 'missing'
+        return Response({'results': [
+            {
+                'id': author_id,
+                'status': (done if author_id in changed
+                           else 'self' if author_id == request.user.id
+                           else skipped if author_id in found
+                           else 'not_found'),
+            }
+            for author_id in author_ids
+        ]})
+
     @action(methods=('GET',),
             detail=False,
             permission_classes=(permissions.IsAuthenticated,))
     def subscriptions(self, request):
+        recipes_limit = self.get_recipes_limit()
         subscriber = request.user
-        queryset = User.objects.filter(
-            following__follower=subscriber
-        ).annotate(recipes_count=Count('recipes'))
+        queryset = User.objects.filter(following__follower=subscriber)
         page = self.paginate_queryset(queryset)
+        FollowSerializer.prefetch_recipes(page, recipes_limit)
         serializer = FollowSerializer(page,
                                       many=True,
-                                      context={'request': request})
+                                      context={'request': request,
+                                               'recipes_limit': recipes_limit})
         return self.get_paginated_response(serializer.data)
@@ -20,3 +20,95 @@ MIN_VALUE = 1
 
 MAX_VALUE = 32766
 """Максимальное значение для валидатора."""
+
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+"""Время жизни кэша списка покупок в секундах."""
+
+AUTOCOMPLETE_LIMIT = 10
+"""Количество подсказок автодополнения ингредиентов по умолчанию."""
+
+AUTOCOMPLETE_MAX_LIMIT = 50
+"""Максимальное количество подсказок автодополнения ингредиентов."""
+
+FUZZY_MIN_LENGTH = 3
+"""Минимальная длина запроса для поиска с опечатками."""
+
+INGREDIENT_INDEX_CHECK_INTERVAL = 5
+"""Период проверки актуальности индекса ингредиентов в секундах."""
+
+SEARCH_CONFIG = 'russian'
+"""Конфигурация полнотекстового поиска PostgreSQL."""
+
+IMAGE_RENDITIONS = {
+    'thumbnail': 320,
+    'card': 640,
+    'full': 1280,
+}
+"""Максимальная ширина уменьшенных копий изображения рецепта."""
+
+IMAGE_WORKERS = 2
+"""Количество потоков для обработки изображений рецептов."""
+
+IMAGE_PLACEHOLDER_WIDTH = 16
+"""Ширина размытой заглушки изображения рецепта."""
+
+IMAGE_SAVE_RETRY_DELAYS = (0.1, 0.5, 2)
+"""Паузы в секундах перед повторами записи копий в занятую базу."""
+
+RECIPE_ORDERINGS = {
+    'popular': ('-popular', '-id'),
+    'trending': ('-trending', '-id'),
+    'new': ('-id',),
+}
+"""Доступные сортировки списка рецептов."""
+
+FAVORITE_WEIGHT = 3
+"""Вес добавления рецепта в избранное в рейтинге."""
+
+CART_WEIGHT = 2
+"""Вес добавления рецепта в список покупок в рейтинге."""
+
+FOLLOW_WEIGHT = 1
+"""Вес подписки на автора в рейтинге его рецептов."""
+
+TRENDING_WINDOW_DAYS = 14
+"""Период в днях, за который учитываются события в рейтинге трендов."""
+
+TRENDING_HALF_LIFE_HOURS = 48
+"""Время в часах, за которое вес события в рейтинге трендов падает вдвое."""
+
+SCORE_BATCH_SIZE = 1000
+"""Количество рейтингов, сохраняемых одним запросом."""
+
+RECIPE_INDEX_CHECK_INTERVAL = 5
+"""Период проверки изменений рецептов индексами в памяти в секундах."""
+
+RECIPE_CHANGES_OVERLAP = 60
+"""Сколько секунд назад перечитываются изменения рецептов при проверке."""
+
+RECIPE_CACHE_VERSION_TIMEOUT = 5
+"""Сколько секунд кэш ответов доверяет версии данных без проверки."""
+
+COOKABLE_LIMIT = 20
+"""Количество подобранных по продуктам рецептов по умолчанию."""
+
+COOKABLE_MAX_LIMIT = 100
+"""Максимальное количество подобранных по продуктам рецептов."""
+
+SIMILAR_LIMIT = 6
+"""Количество похожих рецептов по умолчанию."""
+
+SIMILAR_MAX_LIMIT = 30
+"""Максимальное количество похожих рецептов."""
+
+SIMILAR_MAX_POSTINGS = 2000
+"""Число рецептов с признаком, сверх которого он не добавляет кандидатов."""
+
+FEED_FANOUT_LIMIT = 1000
+"""Число подписчиков, сверх которого рецепты автора не рассылаются в ленты."""
+
+FEED_BACKFILL = 100
+"""Количество последних рецептов автора, добавляемых в ленту при подписке."""
+
+BULK_MAX_ITEMS = 100
+"""Максимальное количество объектов в одном пакетном запросе."""
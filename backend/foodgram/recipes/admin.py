@@ -2,8 +2,11 @@ from django.contrib import admin
 from django.utils.safestring import mark_safe
 
 from foodgram.constants import LIST_PER_PAGE
-from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+from recipes.models import (FavoriteRecipe, Ingredient, PantryItem, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
+from recipes.pantry_index import invalidate_pantry_index
+from recipes.search import update_search_vector
+from recipes.similarity import invalidate_similarity_index
 
 
 class BaseAdmin(admin.ModelAdmin):
@@ -20,15 +23,28 @@ class IngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
     min_num = 1
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(BaseAdmin):
     """Администрирование рецептов."""
 
-    list_filter = ('author', 'tags')
+    # Авторов много, поэтому они ищутся поиском, а не фильтром со
+    # списком всех авторов.
+    search_fields = BaseAdmin.search_fields + (
+        'author__username', 'author__email'
+    )
+    list_filter = ('tags',)
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
     inlines = (IngredientInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags', 'recipe_ingredient__ingredient'
+        )
+
     def get_list_display(self, request):
         return self.list_display + (
             'author',
@@ -41,27 +57,28 @@ class RecipeAdmin(BaseAdmin):
     def get_list_searchable_fields(self, request):
         return self.search_fields + ('author', 'tags')
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        update_search_vector(form.instance.id)
+        invalidate_similarity_index()
+        invalidate_pantry_index()
+
     @admin.display(description='Теги')
     def get_tags(self, obj):
         return ', '.join([tag.name for tag in obj.tags.all()])
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
-        ingredients = []
-        for ingredient in obj.ingredients.all():
-            amount = RecipeIngredient.objects.get(
-                recipe=obj, ingredient=ingredient
-            ).amount
-            ingredients.append(
-                f'{ingredient.name}, '
-                f'{amount}, '
-                f'{ingredient.measurement_unit}'
-            )
-        return ingredients
-
-    @admin.display(description='В избранном')
+        return [
+            f'{recipe_ingredient.ingredient.name}, '
+            f'{recipe_ingredient.amount}, '
+            f'{recipe_ingredient.ingredient.measurement_unit}'
+            for recipe_ingredient in obj.recipe_ingredient.all()
+        ]
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def get_favorite_count(self, obj):
-        return obj.favoriterecipe_recipe.count()
+        return obj.favorites_count
 
     @admin.display(description='Изображение')
     def get_image(self, obj):
@@ -96,8 +113,9 @@ class IngredientAdmin(BaseAdmin):
 
 class CommonRecipeAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
-    list_filter = ('user', 'recipe')
-    search_fields = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    search_fields = ('user__username', 'user__email', 'recipe__name')
     list_per_page = LIST_PER_PAGE
 
 
@@ -109,3 +127,12 @@ class FavoriteRecipeAdmin(CommonRecipeAdmin):
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(CommonRecipeAdmin):
     pass
+
+
+@admin.register(PantryItem)
+class PantryItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient')
+    list_select_related = ('user', 'ingredient')
+    autocomplete_fields = ('user', 'ingredient')
+    search_fields = ('user__username', 'user__email', 'ingredient__name')
+    list_per_page = LIST_PER_PAGE
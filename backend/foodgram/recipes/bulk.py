@@ -0,0 +1,23 @@
+"""Массовая вставка связей пользователей с рецептами и авторами."""
+
+
+def insert_new(queryset, field, values, **defaults):
+    """Вставляет недостающие строки и возвращает значения `field` вставленных.
+
+    `bulk_create` с `ignore_conflicts` пропускает строки, вставленные
+    параллельным запросом, и не сообщает, какие именно. Поэтому после
+    вставки строки перечитываются: своими считаются те, у которых время
+    создания совпадает с проставленным при вставке.
+    """
+
+    objs = queryset.model.objects.bulk_create(
+        (queryset.model(**defaults, **{field: value}) for value in values),
+        ignore_conflicts=True
+    )
+    created_at = {getattr(obj, field): obj.created_at for obj in objs}
+    return {
+        value for value, stored_at in queryset.filter(
+            **{f'{field}__in': created_at}
+        ).values_list(field, 'created_at')
+        if created_at[value] == stored_at
+    }
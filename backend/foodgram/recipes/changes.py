@@ -0,0 +1,68 @@
+"""Поиск изменённых рецептов для индексов в памяти.
+
+Изменение рецепта, его ингредиентов или тегов обновляет
+`Recipe.updated_at`, поэтому изменения из любого процесса видны через
+базу данных. Время изменения проставляется до фиксации транзакции, и
+запись может стать видна позже более новых, поэтому при каждой
+проверке перечитываются рецепты, изменённые за последние
+`RECIPE_CHANGES_OVERLAP` секунд. Удалённые рецепты находятся по
+расхождению числа рецептов.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from foodgram.constants import RECIPE_CHANGES_OVERLAP
+from recipes.models import Recipe
+from recipes.transactions import on_commit_once
+
+
+class RecipeChanges:
+    """Время изменения рецептов, известное индексу."""
+
+    def __init__(self):
+        self._updated = {}
+        self._since = None
+
+    def reset(self):
+        """Запоминает время изменения всех рецептов."""
+
+        self._updated = dict(
+            Recipe.objects.values_list('id', 'updated_at').iterator()
+        )
+        self._since = max(self._updated.values(), default=timezone.now())
+
+    def collect(self):
+        """Возвращает id рецептов, изменённых с прошлой проверки."""
+
+        recent = dict(Recipe.objects.filter(
+            updated_at__gte=self._since
+            - timedelta(seconds=RECIPE_CHANGES_OVERLAP)
+        ).values_list('id', 'updated_at'))
+        changed = {
+            recipe_id for recipe_id, updated_at in recent.items()
+            if self._updated.get(recipe_id) != updated_at
+        }
+        self._updated.update(recent)
+        self._since = max(self._since, *recent.values())
+        if Recipe.objects.count() != len(self._updated):
+            existing = set(Recipe.objects.values_list('id', flat=True))
+            for recipe_id in self._updated.keys() - existing:
+                del self._updated[recipe_id]
+                changed.add(recipe_id)
+            for recipe_id in existing - self._updated.keys():
+                self._updated[recipe_id] = None
+                changed.add(recipe_id)
+        return changed
+
+
+def touch(recipe_ids):
+    Recipe.objects.filter(pk__in=recipe_ids).update(
+        updated_at=timezone.now()
+    )
+
+
+def touch_recipes(*recipe_ids):
+    """Обновляет время изменения рецептов после фиксации транзакции."""
+
+    on_commit_once(touch, *recipe_ids)
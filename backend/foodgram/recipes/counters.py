@@ -0,0 +1,48 @@
+"""Денормализованные счётчики рецептов и пользователей."""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+
+def shift_counter(model, pk, field, delta):
+    """Атомарно изменяет счётчик объекта на `delta`."""
+
+    shift_counters(model, (pk,), field, delta)
+
+
+def shift_counters(model, pks, field, delta):
+    """Атомарно изменяет счётчик нескольких объектов на `delta`."""
+
+    if pks:
+        model.objects.filter(pk__in=pks).update(
+            **{field: Greatest(F(field) + delta, 0)}
+        )
+
+
+def count_of(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def reconcile_counters():
+    """Пересчитывает все счётчики по данным связанных таблиц."""
+
+    recipes = Recipe.objects.update(
+        favorites_count=count_of(FavoriteRecipe, 'recipe'),
+        in_carts_count=count_of(ShoppingCart, 'recipe'),
+    )
+    users = User.objects.update(
+        recipes_count=count_of(Recipe, 'author'),
+        followers_count=count_of(Follow, 'following'),
+    )
+    return recipes, users
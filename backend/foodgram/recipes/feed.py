@@ -0,0 +1,114 @@
+"""Ленты рецептов от авторов, на которых подписан пользователь.
+
+Новый рецепт автора сразу записывается в ленты всех его подписчиков,
+поэтому чтение ленты сводится к выборке по индексу. Рецепты авторов,
+у которых больше `FEED_FANOUT_LIMIT` подписчиков, не рассылаются, а
+подмешиваются в ленту при чтении. И рассылка, и чтение решают это по
+счётчику `followers_count`. Когда подписчиков становится не больше
+предела, последние рецепты автора дописываются в ленты всех
+подписчиков, поскольку подмешиваться при чтении они перестают.
+"""
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from foodgram.constants import FEED_BACKFILL, FEED_FANOUT_LIMIT
+from recipes.models import FeedEntry, Recipe, User
+from recipes.transactions import on_commit_once
+from users.models import Follow
+
+
+def is_pulled(author_id):
+    return User.objects.filter(
+        pk=author_id, followers_count__gt=FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out_recipe(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+
+    if is_pulled(recipe.author_id):
+        return
+    followers = Follow.objects.filter(
+        following=recipe.author_id
+    ).values_list('follower_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=follower_id, recipe=recipe,
+                   author_id=recipe.author_id)
+         for follower_id in followers.iterator()),
+        ignore_conflicts=True,
+    )
+
+
+def latest_recipes(author_ids):
+    """Возвращает id последних `FEED_BACKFILL` рецептов каждого автора."""
+
+    recipes = {}
+    for recipe_id, author_id in Recipe.objects.filter(
+        author__in=author_ids
+    ).annotate(
+        position=Window(
+            RowNumber(), partition_by=F('author'), order_by=F('id').desc()
+        )
+    ).filter(position__lte=FEED_BACKFILL).values_list('id', 'author_id'):
+        recipes.setdefault(author_id, []).append(recipe_id)
+    return recipes
+
+
+def backfill_feed(follower_id, *author_ids):
+    """Добавляет в ленту нового подписчика последние рецепты авторов."""
+
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=follower_id, recipe_id=recipe_id,
+                   author_id=author_id)
+         for author_id, recipe_ids in latest_recipes(author_ids).items()
+         for recipe_id in recipe_ids),
+        ignore_conflicts=True,
+    )
+
+
+def backfill_followers(author_ids):
+    recipes = latest_recipes(author_ids)
+    follows = Follow.objects.filter(
+        following__in=recipes
+    ).values_list('follower_id', 'following_id')
+    FeedEntry.objects.bulk_create(
+        (FeedEntry(user_id=follower_id, recipe_id=recipe_id,
+                   author_id=author_id)
+         for follower_id, author_id in follows.iterator()
+         for recipe_id in recipes[author_id]),
+        ignore_conflicts=True,
+    )
+
+
+def resume_fan_out(author_id):
+    """Возвращает автора к рассылке, если подписчиков стало не больше предела.
+
+    Рецепты, опубликованные, пока автор подмешивался при чтении, после
+    фиксации транзакции дописываются в ленты его подписчиков.
+    """
+
+    if User.objects.filter(
+        pk=author_id, followers_count=FEED_FANOUT_LIMIT
+    ).exists():
+        on_commit_once(backfill_followers, author_id)
+
+
+def clear_feed(follower_id, author_id):
+    """Убирает из ленты рецепты автора после отписки."""
+
+    FeedEntry.objects.filter(user=follower_id, author=author_id).delete()
+
+
+def feed_filter(user):
+    """Условие выборки рецептов из ленты пользователя."""
+
+    condition = Q(pk__in=FeedEntry.objects.filter(
+        user=user
+    ).values('recipe'))
+    pulled_authors = list(Follow.objects.filter(
+        follower=user,
+        following__followers_count__gt=FEED_FANOUT_LIMIT
+    ).values_list('following_id', flat=True))
+    if pulled_authors:
+        condition |= Q(author__in=pulled_authors)
+    return condition
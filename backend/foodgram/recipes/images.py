@@ -0,0 +1,167 @@
+"""Фоновая подготовка уменьшенных копий изображений рецептов.
+
+После сохранения рецепта с новым изображением его копии в формате WebP
+создаются в пуле потоков, не задерживая ответ на запрос. В запросе
+остаётся только декодирование base64: изображение проверяется при
+валидации, чтобы ошибка вернулась ответом 400, а не потерялась в фоне.
+Запись сведений о копиях короткая и при занятой базе, например при
+записи из другого потока в SQLite, повторяется без повторной обработки
+изображения. Файлы прежних копий удаляются при их замене и при
+удалении рецепта.
+Сведения о копиях сохраняются в `Recipe.image_renditions`:
+
+    {'source': <имя исходного файла>,
+     'placeholder': <data URI размытой заглушки>,
+     'variants': {<название>: {'name', 'width', 'height'}}}
+"""
+import logging
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from os import path
+from time import sleep
+
+from django.core.files.base import ContentFile
+from django.db import OperationalError, connections, transaction
+from PIL import Image, ImageFilter, ImageOps
+
+from foodgram.constants import (IMAGE_PLACEHOLDER_WIDTH, IMAGE_RENDITIONS,
+                                IMAGE_SAVE_RETRY_DELAYS, IMAGE_WORKERS)
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=IMAGE_WORKERS, thread_name_prefix='recipe-images'
+)
+
+
+def renditions_outdated(recipe):
+    return bool(recipe.image) and (
+        recipe.image_renditions.get('source') != recipe.image.name
+    )
+
+
+def schedule_renditions(recipe_id):
+    """Ставит создание копий в очередь после фиксации транзакции."""
+
+    transaction.on_commit(
+        lambda: executor.submit(generate_in_background, recipe_id)
+    )
+
+
+def delete_files(names):
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        storage.delete(name)
+
+
+def delete_renditions(renditions, keep=()):
+    """Удаляет файлы копий после фиксации транзакции."""
+
+    names = [
+        variant['name']
+        for variant in renditions.get('variants', {}).values()
+        if variant['name'] not in keep
+    ]
+    if names:
+        transaction.on_commit(lambda: delete_files(names))
+
+
+def render_variant(image, name, width):
+    variant = image.copy()
+    variant.thumbnail((width, width * image.height // image.width))
+    buffer = BytesIO()
+    variant.save(buffer, 'WEBP', quality=80, method=4)
+    return variant.size, ContentFile(buffer.getvalue(), name=name)
+
+
+def render_placeholder(image):
+    """Возвращает крошечную размытую копию изображения в виде data URI."""
+
+    placeholder = image.copy()
+    placeholder.thumbnail((IMAGE_PLACEHOLDER_WIDTH, IMAGE_PLACEHOLDER_WIDTH))
+    buffer = BytesIO()
+    placeholder.filter(ImageFilter.GaussianBlur(1)).save(
+        buffer, 'WEBP', quality=30
+    )
+    return 'data:image/webp;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def build_renditions(recipe):
+    """Создаёт копии изображения рецепта и возвращает сведения о них."""
+
+    storage = recipe.image.storage
+    directory, filename = path.split(recipe.image.name)
+    stem = path.splitext(filename)[0]
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    variants = {}
+    for name, width in IMAGE_RENDITIONS.items():
+        (variant_width, variant_height), content = render_variant(
+            image, path.join(directory, 'renditions', f'{stem}_{name}.webp'),
+            width
+        )
+        variants[name] = {
+            'name': storage.save(content.name, content),
+            'width': variant_width,
+            'height': variant_height,
+        }
+    return {
+        'source': recipe.image.name,
+        'placeholder': render_placeholder(image),
+        'variants': variants,
+    }
+
+
+def update_renditions(recipe_id, force=False):
+    """Создаёт и сохраняет копии изображения, если они устарели."""
+
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not (
+        renditions_outdated(recipe) or force and recipe.image
+    ):
+        return False
+    renditions = build_renditions(recipe)
+    for delay in IMAGE_SAVE_RETRY_DELAYS:
+        try:
+            return save_renditions(recipe_id, renditions)
+        except OperationalError as error:
+            logger.warning('Повтор записи копий рецепта %s: %s',
+                           recipe_id, error)
+            sleep(delay)
+    return save_renditions(recipe_id, renditions)
+
+
+def save_renditions(recipe_id, renditions):
+    """Сохраняет сведения о копиях, если изображение не сменилось."""
+
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=renditions['source']
+        ).first()
+        if recipe is None:
+            delete_renditions(renditions)
+            return False
+        delete_renditions(recipe.image_renditions, keep={
+            variant['name'] for variant in renditions['variants'].values()
+        })
+        recipe.image_renditions = renditions
+        recipe.save(update_fields=('image_renditions', 'updated_at'))
+    return True
+
+
+def generate_renditions(recipe_id):
+    try:
+        update_renditions(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+
+
+def generate_in_background(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    finally:
+        connections.close_all()
@@ -0,0 +1,119 @@
+"""Индекс ингредиентов в памяти для автодополнения.
+
+Индекс строится из таблицы ингредиентов при первом обращении и
+перестраивается, когда меняется версия таблицы: число строк и время
+последнего изменения. Версия проверяется в базе данных не чаще раза
+в `INGREDIENT_INDEX_CHECK_INTERVAL` секунд, поэтому изменения из
+других процессов, например из команды импорта, видны с этой задержкой.
+Поиск не обращается к базе данных: сначала выдаются совпадения по
+началу названия, затем по подстроке и в конце названия с опечаткой.
+"""
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.db import transaction
+from django.db.models import Count, Max
+
+from foodgram.constants import (FUZZY_MIN_LENGTH,
+                                INGREDIENT_INDEX_CHECK_INTERVAL)
+from recipes.models import Ingredient
+
+
+def within_one_edit(first, second):
+    """Проверяет, что строки отличаются не более чем на одну правку."""
+
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    for index, (left, right) in enumerate(zip(first, second)):
+        if left != right:
+            if len(first) == len(second):
+                return (first[index + 1:] == second[index + 1:]
+                        or (first[index] == second[index + 1]
+                            and first[index + 1] == second[index]
+                            and first[index + 2:] == second[index + 2:]))
+            return first[index:] == second[index + 1:]
+    return True
+
+
+class IngredientIndex:
+    """Отсортированный по названию список ингредиентов."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._checked_at = None
+        self._data = (None, [], [])
+
+    def _actual(self):
+        if (self._checked_at is None
+                or monotonic() - self._checked_at
+                >= INGREDIENT_INDEX_CHECK_INTERVAL):
+            with self._lock:
+                version = tuple(Ingredient.objects.aggregate(
+                    Count('id'), Max('updated_at')
+                ).values())
+                if version != self._data[0]:
+                    self._build(version)
+                self._checked_at = monotonic()
+        return self._data[1:]
+
+    def invalidate(self):
+        self._checked_at = None
+
+    def _build(self, version):
+        items = sorted(
+            Ingredient.objects.values('id', 'name', 'measurement_unit'),
+            key=lambda item: (item['name'].lower(), item['id'])
+        )
+        self._data = (
+            version, [item['name'].lower() for item in items], items
+        )
+
+    def search(self, name, limit):
+        """Возвращает до `limit` ингредиентов, подходящих под запрос."""
+
+        keys, items = self._actual()
+        query = name.strip().lower()
+        if not query:
+            return items[:limit]
+        found = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(found) < limit
+               and keys[position].startswith(query)):
+            found.append(position)
+            position += 1
+        if len(found) < limit:
+            found.extend(self._scan(
+                keys, limit - len(found),
+                lambda key: query in key and not key.startswith(query)
+            ))
+        if len(found) < limit and len(query) >= FUZZY_MIN_LENGTH:
+            found.extend(self._scan(
+                keys, limit - len(found),
+                lambda key: query not in key and any(
+                    within_one_edit(query, key[:length])
+                    for length in range(len(query) - 1, len(query) + 2)
+                )
+            ))
+        return [items[position] for position in found]
+
+    @staticmethod
+    def _scan(keys, limit, match):
+        found = []
+        for position, key in enumerate(keys):
+            if match(key):
+                found.append(position)
+                if len(found) == limit:
+                    break
+        return found
+
+
+ingredient_index = IngredientIndex()
+
+
+def invalidate_ingredient_index():
+    """Проверяет версию индекса при следующем поиске в этом процессе."""
+
+    transaction.on_commit(ingredient_index.invalidate)
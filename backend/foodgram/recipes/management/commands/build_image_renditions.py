@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import update_renditions
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создание уменьшенных копий изображений существующих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии даже для актуальных изображений.',
+        )
+
+    def handle(self, **options):
+        updated = failed = 0
+        recipe_ids = Recipe.objects.exclude(image='').values_list(
+            'id', flat=True
+        )
+        for recipe_id in recipe_ids.iterator():
+            try:
+                updated += update_renditions(recipe_id, options['force'])
+            except Exception as error:
+                failed += 1
+                self.stdout.write(f'Рецепт {recipe_id}: {error}')
+        self.stdout.write(
+            f'Обновлены копии изображений: {updated}, ошибок: {failed}'
+        )
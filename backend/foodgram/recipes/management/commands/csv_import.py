@@ -1,41 +1,106 @@
 import csv
+import json
+from itertools import islice
 from os import path
+from time import monotonic
 
-from django.apps import apps
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db.utils import IntegrityError
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import Ingredient
 
-class FileOpenException(Exception):
-    """Вызов исключения при некорректном открытии файла."""
-    pass
+BATCH_SIZE = 1000
+"""Количество ингредиентов, вставляемых одним запросом."""
 
 
 class Command(BaseCommand):
+    help = 'Импорт ингредиентов из CSV или JSON файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            default='csv',
+            help='Формат файла с ингредиентами.',
+        )
+        parser.add_argument(
+            '--file',
+            help='Путь к файлу. По умолчанию data/ingredients.<format>.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество записей в одном запросе.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Прочитать файл без записи в базу данных.',
+        )
+
+    @staticmethod
+    def read_csv(file):
+        for row in csv.reader(file):
+            if row:
+                name, measurement_unit = row
+                yield name, measurement_unit
+
+    @staticmethod
+    def read_json(file):
+        for item in json.load(file):
+            yield item['name'], item['measurement_unit']
+
+    @staticmethod
+    def batches(rows, size):
+        rows = iter(rows)
+        while batch := list(islice(rows, size)):
+            yield batch
+
     def handle(self, **options):
-        model_class = apps.get_model('recipes', 'ingredient')
-        path_to_csv = path.join(
-            settings.BASE_DIR,
-            'data/ingredients.csv'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        file_format = options['format']
+        path_to_file = options['file'] or path.join(
+            settings.BASE_DIR, f'data/ingredients.{file_format}'
         )
+        reader = getattr(self, f'read_{file_format}')
+        started = monotonic()
+        total = 0
+        count_before = Ingredient.objects.count()
         try:
-            with open(path_to_csv, newline='', encoding='utf-8') as f:
-                dataframe = csv.reader(f)
-                for name_column, unit_column in dataframe:
-                    try:
-                        model_class.objects.get_or_create(
-                            name=name_column,
-                            measurement_unit=unit_column
-                        )
-                    except IntegrityError:
-                        self.stdout.write(
-                            f'Объект "ingredient" ID:'
-                            f'{name_column.get("id")} уже существует'
-                        )
+            with open(path_to_file, newline='', encoding='utf-8') as file, \
+                    transaction.atomic():
+                for batch in self.batches(reader(file),
+                                          options['batch_size']):
+                    total += len(batch)
+                    if options['dry_run']:
                         continue
-                self.stdout.write(
-                    'Закончен импорт ингридиентов в базу данных'
-                )
-        except FileOpenException as error:
-            self.stdout.write(f'Ошибка при открытии файла: {error}')
+                    Ingredient.objects.bulk_create(
+                        (Ingredient(name=name, measurement_unit=unit)
+                         for name, unit in batch),
+                        ignore_conflicts=True,
+                    )
+        except OSError as error:
+            raise CommandError(f'Ошибка при открытии файла: {error}')
+        except (ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Некорректные данные в файле: {error}')
+        elapsed = monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(
+                f'Пробный запуск: прочитано {total} ингредиентов, '
+                f'время {elapsed:.2f} с'
+            )
+            return
+        inserted = Ingredient.objects.count() - count_before
+        if inserted:
+            invalidate_ingredient_index()
+            call_command('build_snapshots', 'ingredients')
+        self.stdout.write(
+            f'Закончен импорт ингридиентов в базу данных: '
+            f'прочитано {total}, добавлено {inserted}, '
+            f'пропущено {total - inserted}, время {elapsed:.2f} с'
+        )
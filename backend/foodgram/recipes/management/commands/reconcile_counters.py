@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, покупок, рецептов и подписчиков.'
+
+    def handle(self, **options):
+        recipes, users = reconcile_counters()
+        self.stdout.write(
+            f'Счётчики пересчитаны: рецептов {recipes}, пользователей {users}'
+        )
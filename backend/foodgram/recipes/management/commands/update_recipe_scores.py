@@ -0,0 +1,17 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+from recipes.ranking import update_recipe_scores
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт рейтингов популярности рецептов.'
+
+    def handle(self, **options):
+        started = monotonic()
+        total = update_recipe_scores()
+        self.stdout.write(
+            f'Рейтинги пересчитаны: рецептов {total}, '
+            f'время {monotonic() - started:.2f} с'
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_recipe_scores'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PantryItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pantry_items', to='recipes.ingredient', verbose_name='Ингридиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pantry', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Продукт в наличии',
+                'verbose_name_plural': 'Продукты в наличии',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='pantryitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_pantry_item'),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Coalesce
 
 from foodgram.constants import (LENGTH_FOR_FIELD_RECIPES, MAX_VALUE, MIN_VALUE,
-                                SLICE)
+                                RECIPE_ORDERINGS, SLICE)
 
 User = get_user_model()
 
@@ -16,6 +19,10 @@ class NameBaseModel(models.Model):
         max_length=LENGTH_FOR_FIELD_RECIPES,
         verbose_name='Название',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
 
     class Meta:
         abstract = True
@@ -63,6 +70,58 @@ class Ingredient(NameBaseModel):
         )
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для рецептов."""
+
+    @staticmethod
+    def related_lookups():
+        """Связи, которые читает сериализатор рецепта."""
+
+        return (
+            'tags',
+            models.Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты рецептов."""
+
+        return self.select_related('author').prefetch_related(
+            *self.related_lookups()
+        )
+
+    def ordered_by(self, ordering):
+        """Сортирует рецепты по рейтингу или по новизне.
+
+        Рецепт без рассчитанного рейтинга считается рецептом с нулевым
+        рейтингом, чтобы он не оказывался в начале выдачи и не выпадал
+        из выборки по курсору.
+        """
+
+        queryset = self
+        if ordering in ('popular', 'trending'):
+            queryset = queryset.annotate(
+                **{ordering: Coalesce(F(f'score__{ordering}'), 0.0)}
+            )
+        return queryset.order_by(*RECIPE_ORDERINGS[ordering])
+
+    def with_user_flags(self, user):
+        """Аннотирует признаки избранного и списка покупок."""
+
+        if not user.is_authenticated:
+            return self
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+
 class Recipe(NameBaseModel):
     """Модель рецепта."""
 
@@ -76,6 +135,12 @@ class Recipe(NameBaseModel):
         upload_to='recipes/images/',
         verbose_name='Картинка',
     )
+    image_renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения',
+    )
     text = models.TextField(
         verbose_name='Описание',
     )
@@ -102,10 +167,33 @@ class Recipe(NameBaseModel):
         )
     )
 
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        verbose_name='В избранном',
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок',
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор',
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
     class Meta(NameBaseModel.Meta):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        ordering = ('-id',)
         default_related_name = 'recipe'
+        indexes = (
+            models.Index(fields=('updated_at',), name='recipe_updated_at_idx'),
+        )
 
 
 class RecipeIngredient(models.Model):
@@ -119,6 +207,7 @@ class RecipeIngredient(models.Model):
     ingredient = models.ForeignKey(
         Ingredient,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name='Ингридиент',
     )
     amount = models.PositiveSmallIntegerField(
@@ -145,6 +234,12 @@ class RecipeIngredient(models.Model):
                 name='unique_recipe_ingredient',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='recipe_ingredient_lookup_idx',
+            ),
+        )
 
     def __str__(self):
         return self.ingredient.name[:SLICE]
@@ -164,6 +259,11 @@ class UserRecipeBaseModel(models.Model):
         related_name='%(class)s_recipe',
         verbose_name='Рецепт',
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата добавления',
+    )
 
     class Meta:
         abstract = True
@@ -192,3 +292,121 @@ class ShoppingCart(UserRecipeBaseModel):
     class Meta(UserRecipeBaseModel.Meta):
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Списки покупок'
+
+
+class PantryItem(models.Model):
+    """Модель продукта, который есть у пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='pantry',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='pantry_items',
+        verbose_name='Ингридиент',
+    )
+
+    class Meta:
+        verbose_name = 'Продукт в наличии'
+        verbose_name_plural = 'Продукты в наличии'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_pantry_item',
+            ),
+        )
+
+    def __str__(self):
+        return self.ingredient.name[:SLICE]
+
+
+class FeedEntry(models.Model):
+    """Модель записи в ленте рецептов подписчика."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name='+',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_entry_user_author_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user_id}: {self.recipe_id}'
+
+
+class RecipeScore(models.Model):
+    """Модель рейтинга рецепта.
+
+    Заполняется периодически командой `update_recipe_scores`.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт',
+    )
+    popular = models.FloatField(
+        default=0,
+        verbose_name='Популярность',
+    )
+    trending = models.FloatField(
+        default=0,
+        verbose_name='Популярность за последнее время',
+    )
+    computed_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата расчёта',
+    )
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+        indexes = (
+            models.Index(
+                fields=('-popular', '-recipe'),
+                name='recipe_score_popular_idx',
+            ),
+            models.Index(
+                fields=('-trending', '-recipe'),
+                name='recipe_score_trending_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.popular:.1f}/{self.trending:.1f}'
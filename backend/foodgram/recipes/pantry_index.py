@@ -0,0 +1,135 @@
+"""Индекс состава рецептов в памяти для подбора по продуктам в наличии.
+
+Для каждого рецепта хранится кортеж отсортированных id ингредиентов, а
+для каждого ингредиента — множество содержащих его рецептов. Подбор
+считает совпадения только по спискам продуктов пользователя и не
+обращается к базе данных.
+
+Индекс строится целиком при первом обращении, а дальше не чаще раза в
+`RECIPE_INDEX_CHECK_INTERVAL` секунд находит в базе изменённые рецепты
+и перечитывает состав только их, поэтому видит изменения из всех
+процессов.
+"""
+from collections import Counter
+from heapq import nsmallest
+from threading import Lock
+from time import monotonic
+
+from django.db import transaction
+
+from foodgram.constants import RECIPE_INDEX_CHECK_INTERVAL
+from recipes.changes import RecipeChanges
+from recipes.models import RecipeIngredient
+
+
+def recipe_compositions(recipe_ids=None):
+    """Возвращает отсортированные id ингредиентов рецептов."""
+
+    rows = RecipeIngredient.objects.order_by(
+        'recipe_id', 'ingredient_id'
+    ).values_list('recipe_id', 'ingredient_id')
+    if recipe_ids is not None:
+        rows = rows.filter(recipe__in=recipe_ids)
+    compositions = {}
+    for recipe_id, ingredient_id in rows.iterator():
+        compositions.setdefault(recipe_id, []).append(ingredient_id)
+    return compositions
+
+
+class PantryIndex:
+    """Состав рецептов и обратный индекс по ингредиентам."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._changes = RecipeChanges()
+        self._checked_at = None
+        self._built = False
+        self._recipes = {}
+        self._postings = {}
+
+    def _add(self, recipe_id, ingredient_ids):
+        self._recipes[recipe_id] = tuple(ingredient_ids)
+        for ingredient_id in ingredient_ids:
+            self._postings.setdefault(ingredient_id, set()).add(recipe_id)
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipes.pop(recipe_id, ()):
+            self._postings[ingredient_id].discard(recipe_id)
+            if not self._postings[ingredient_id]:
+                del self._postings[ingredient_id]
+
+    def _build(self):
+        self._changes.reset()
+        self._recipes = {}
+        self._postings = {}
+        for recipe_id, ingredient_ids in recipe_compositions().items():
+            self._add(recipe_id, ingredient_ids)
+        self._built = True
+
+    def _update(self, recipe_ids):
+        for recipe_id in recipe_ids:
+            self._remove(recipe_id)
+        for recipe_id, ingredient_ids in recipe_compositions(
+            recipe_ids
+        ).items():
+            self._add(recipe_id, ingredient_ids)
+
+    def _actualize(self):
+        if not self._built:
+            self._build()
+        elif (self._checked_at is None
+              or monotonic() - self._checked_at
+              >= RECIPE_INDEX_CHECK_INTERVAL):
+            changed = self._changes.collect()
+            if changed:
+                self._update(changed)
+        else:
+            return
+        self._checked_at = monotonic()
+
+    def invalidate(self):
+        self._checked_at = None
+
+    def match(self, ingredient_ids, limit, max_missing=None):
+        """Подбирает рецепты, для которых есть больше всего продуктов.
+
+        Возвращает до `limit` кортежей `(id рецепта, доля имеющихся
+        ингредиентов, id недостающих ингредиентов)`, упорядоченных по
+        числу недостающих ингредиентов и по убыванию доли имеющихся.
+        """
+
+        pantry = set(ingredient_ids)
+        with self._lock:
+            self._actualize()
+            hits = Counter()
+            for ingredient_id in pantry:
+                hits.update(self._postings.get(ingredient_id, ()))
+            # При равном числе недостающих ингредиентов доля имеющихся
+            # больше у рецепта с большим числом ингредиентов.
+            candidates = (
+                (len(self._recipes[recipe_id]) - count,
+                 -len(self._recipes[recipe_id]),
+                 -recipe_id)
+                for recipe_id, count in hits.items()
+            )
+            if max_missing is not None:
+                candidates = (candidate for candidate in candidates
+                              if candidate[0] <= max_missing)
+            return [
+                (-negative_id, 1 - missing / -negative_size, [
+                    ingredient_id
+                    for ingredient_id in self._recipes[-negative_id]
+                    if ingredient_id not in pantry
+                ])
+                for missing, negative_size, negative_id
+                in nsmallest(limit, candidates)
+            ]
+
+
+pantry_index = PantryIndex()
+
+
+def invalidate_pantry_index():
+    """Проверяет изменения рецептов при следующем подборе в этом процессе."""
+
+    transaction.on_commit(pantry_index.invalidate)
@@ -0,0 +1,76 @@
+"""Расчёт рейтинга рецептов для сортировки по популярности.
+
+`popular` складывается из счётчиков избранного, списков покупок и
+подписчиков автора за всё время. `trending` учитывает только события
+последних `TRENDING_WINDOW_DAYS` дней, причём вес каждого события
+убывает вдвое за `TRENDING_HALF_LIFE_HOURS` часов.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from foodgram.constants import (CART_WEIGHT, FAVORITE_WEIGHT, FOLLOW_WEIGHT,
+                                SCORE_BATCH_SIZE, TRENDING_HALF_LIFE_HOURS,
+                                TRENDING_WINDOW_DAYS)
+from recipes.models import FavoriteRecipe, Recipe, RecipeScore, ShoppingCart
+from users.models import Follow
+
+
+def decay(age):
+    return 0.5 ** (age / timedelta(hours=TRENDING_HALF_LIFE_HOURS))
+
+
+def recent_weights(queryset, field, weight, now):
+    """Суммирует убывающие веса событий за период по значению `field`."""
+
+    weights = defaultdict(float)
+    for key, created_at in queryset.filter(
+        created_at__gte=now - timedelta(days=TRENDING_WINDOW_DAYS)
+    ).values_list(field, 'created_at').iterator():
+        weights[key] += weight * decay(now - created_at)
+    return weights
+
+
+def recipe_scores(now):
+    favorites = recent_weights(
+        FavoriteRecipe.objects, 'recipe_id', FAVORITE_WEIGHT, now
+    )
+    carts = recent_weights(ShoppingCart.objects, 'recipe_id', CART_WEIGHT, now)
+    follows = recent_weights(
+        Follow.objects, 'following_id', FOLLOW_WEIGHT, now
+    )
+    for recipe_id, author_id, favorites_count, in_carts_count, followers in (
+        Recipe.objects.order_by().values_list(
+            'id', 'author_id', 'favorites_count', 'in_carts_count',
+            'author__followers_count'
+        ).iterator()
+    ):
+        yield RecipeScore(
+            recipe_id=recipe_id,
+            popular=(FAVORITE_WEIGHT * favorites_count
+                     + CART_WEIGHT * in_carts_count
+                     + FOLLOW_WEIGHT * followers),
+            trending=(favorites.get(recipe_id, 0)
+                      + carts.get(recipe_id, 0)
+                      + follows.get(author_id, 0)),
+        )
+
+
+def update_recipe_scores(now=None):
+    """Пересчитывает рейтинги всех рецептов и возвращает их количество."""
+
+    scores = recipe_scores(now or timezone.now())
+    total = 0
+    with transaction.atomic():
+        while batch := list(islice(scores, SCORE_BATCH_SIZE)):
+            RecipeScore.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=('recipe',),
+                update_fields=('popular', 'trending', 'computed_at'),
+            )
+            total += len(batch)
+    return total
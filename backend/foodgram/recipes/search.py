@@ -0,0 +1,60 @@
+"""Полнотекстовый поиск рецептов.
+
+В PostgreSQL у рецепта хранится поисковый вектор из названия,
+ингредиентов и описания, проиндексированный GIN. Для остальных СУБД
+вектор не заполняется, а поиск выполняется обычным `icontains`.
+"""
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from foodgram.constants import SEARCH_CONFIG
+from recipes.models import Recipe, RecipeIngredient
+from recipes.transactions import on_commit_once
+
+
+def full_text_search_enabled():
+    return connection.vendor == 'postgresql'
+
+
+def recipe_search_vector():
+    """Выражение поискового вектора рецепта."""
+
+    # Агрегаты PostgreSQL требуют драйвер psycopg при импорте.
+    from django.contrib.postgres.aggregates import StringAgg
+
+    ingredient_names = RecipeIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(Subquery(ingredient_names), Value('')),
+            weight='B',
+            config=SEARCH_CONFIG
+        )
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vector(*recipe_ids):
+    """Пересчитывает поисковый вектор рецептов."""
+
+    if full_text_search_enabled():
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            search_vector=recipe_search_vector()
+        )
+
+
+def update_search_vectors(recipe_ids):
+    update_search_vector(*recipe_ids)
+
+
+def refresh_search_vectors(*recipe_ids):
+    """Пересчитывает поисковый вектор рецептов после фиксации транзакции."""
+
+    if full_text_search_enabled():
+        on_commit_once(update_search_vectors, *recipe_ids)
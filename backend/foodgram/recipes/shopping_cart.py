@@ -0,0 +1,44 @@
+"""Кэш агрегированного списка покупок пользователей.
+
+Для каждого пользователя хранится словарь `id ингредиента -> количество`.
+Ключ записи содержит версию корзины из базы данных: число строк
+корзины, наибольший их id и время последнего изменения входящих в неё
+рецептов. Любое изменение корзины или состава рецептов в ней, в том
+числе из другого процесса, меняет версию, и список собирается заново,
+а записи старых версий вытесняются по истечении срока.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+
+from foodgram.constants import SHOPPING_CART_CACHE_TIMEOUT
+from recipes.models import RecipeIngredient, ShoppingCart
+
+
+def cart_version(user_id):
+    version = ShoppingCart.objects.filter(user=user_id).aggregate(
+        count=Count('id'), last_id=Max('id'),
+        updated_at=Max('recipe__updated_at')
+    )
+    if not version['count']:
+        return None
+    return '{count}:{last_id}:{}'.format(
+        version['updated_at'].timestamp(), **version
+    )
+
+
+def get_cart_totals(user_id):
+    """Возвращает суммарное количество ингредиентов в списке покупок."""
+
+    version = cart_version(user_id)
+    if version is None:
+        return {}
+    key = f'shopping_cart:{user_id}:{version}'
+    totals = cache.get(key)
+    if totals is None:
+        totals = dict(RecipeIngredient.objects.filter(
+            recipe__shoppingcart_recipe__user=user_id
+        ).values('ingredient_id').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient_id', 'total'))
+        cache.set(key, totals, SHOPPING_CART_CACHE_TIMEOUT)
+    return totals
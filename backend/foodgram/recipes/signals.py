@@ -0,0 +1,104 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.changes import touch_recipes
+from recipes.counters import shift_counter
+from recipes.feed import fan_out_recipe
+from recipes.images import (delete_renditions, renditions_outdated,
+                            schedule_renditions)
+from recipes.ingredient_index import invalidate_ingredient_index
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, RecipeScore, ShoppingCart, Tag,
+                            User)
+from recipes.pantry_index import invalidate_pantry_index
+from recipes.search import refresh_search_vectors
+from recipes.similarity import invalidate_similarity_index
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    """Сбрасывает индексы ингредиентов при изменении ингредиента."""
+
+    invalidate_ingredient_index()
+    invalidate_pantry_index()
+
+
+@receiver((post_save, pre_delete), sender=Ingredient)
+def ingredient_renamed(instance, **kwargs):
+    """Пересчитывает поисковый вектор рецептов с ингредиентом."""
+
+    refresh_search_vectors(*instance.recipe.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    """Ставит в очередь создание копий нового изображения рецепта."""
+
+    if renditions_outdated(instance):
+        schedule_renditions(instance.id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    if created:
+        shift_counter(User, instance.author_id, 'recipes_count', 1)
+        RecipeScore.objects.create(recipe=instance)
+        fan_out_recipe(instance)
+        invalidate_pantry_index()
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    shift_counter(User, instance.author_id, 'recipes_count', -1)
+    delete_renditions(instance.image_renditions)
+    invalidate_pantry_index()
+    invalidate_similarity_index()
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+def favorite_added(instance, created, **kwargs):
+    if created:
+        shift_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+def favorite_removed(instance, **kwargs):
+    shift_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_added(instance, created, **kwargs):
+    if created:
+        shift_counter(Recipe, instance.recipe_id, 'in_carts_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def cart_removed(instance, **kwargs):
+    shift_counter(Recipe, instance.recipe_id, 'in_carts_count', -1)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    """Отмечает рецепт изменённым."""
+
+    touch_recipes(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    """Отмечает изменёнными рецепты, у которых поменялись теги."""
+
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_recipes(instance.pk)
+    elif action == 'pre_clear':
+        touch_recipes(*instance.recipe.values_list('id', flat=True))
+    else:
+        touch_recipes(*pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(instance, **kwargs):
+    touch_recipes(*instance.recipe.values_list('id', flat=True))
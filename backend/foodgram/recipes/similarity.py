@@ -0,0 +1,145 @@
+"""Индекс похожих рецептов.
+
+Рецепт описывается разреженным вектором из своих ингредиентов и тегов
+с весами IDF, а похожесть считается как косинус между векторами.
+Сравниваются только рецепты с общими признаками, найденные по
+обратному индексу; по слишком частым признакам новые кандидаты не
+набираются, а лишь уточняется оценка уже найденных.
+
+Индекс строится целиком при первом обращении, а дальше не чаще раза в
+`RECIPE_INDEX_CHECK_INTERVAL` секунд находит в базе изменённые рецепты
+и перечитывает признаки только их. Любое изменение сдвигает веса IDF
+всех признаков, поэтому нормы векторов после него считаются заново
+по мере обращения к ним.
+"""
+from heapq import nlargest
+from math import log, sqrt
+from threading import Lock
+from time import monotonic
+
+from django.db import transaction
+
+from foodgram.constants import (RECIPE_INDEX_CHECK_INTERVAL,
+                                SIMILAR_MAX_POSTINGS)
+from recipes.changes import RecipeChanges
+from recipes.models import Recipe, RecipeIngredient
+
+
+def recipe_features(recipe_ids=None):
+    """Возвращает признаки рецептов: id ингредиентов и минус id тегов."""
+
+    ingredients = RecipeIngredient.objects.values_list(
+        'recipe_id', 'ingredient_id'
+    )
+    tags = Recipe.tags.through.objects.values_list('recipe_id', 'tag_id')
+    if recipe_ids is not None:
+        ingredients = ingredients.filter(recipe__in=recipe_ids)
+        tags = tags.filter(recipe__in=recipe_ids)
+    features = {}
+    for recipe_id, ingredient_id in ingredients.iterator():
+        features.setdefault(recipe_id, set()).add(ingredient_id)
+    for recipe_id, tag_id in tags.iterator():
+        features.setdefault(recipe_id, set()).add(-tag_id)
+    return features
+
+
+class SimilarityIndex:
+    """Векторы рецептов и обратный индекс по признакам."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self._changes = RecipeChanges()
+        self._checked_at = None
+        self._built = False
+        self._features = {}
+        self._postings = {}
+        self._norms = {}
+
+    def _weight(self, feature):
+        return log(1 + len(self._features) / len(self._postings[feature]))
+
+    def _norm(self, recipe_id):
+        if recipe_id not in self._norms:
+            self._norms[recipe_id] = sqrt(sum(
+                self._weight(feature) ** 2
+                for feature in self._features[recipe_id]
+            ))
+        return self._norms[recipe_id]
+
+    def _add(self, recipe_id, features):
+        self._features[recipe_id] = frozenset(features)
+        for feature in features:
+            self._postings.setdefault(feature, set()).add(recipe_id)
+
+    def _remove(self, recipe_id):
+        for feature in self._features.pop(recipe_id, ()):
+            self._postings[feature].discard(recipe_id)
+            if not self._postings[feature]:
+                del self._postings[feature]
+
+    def _build(self):
+        self._changes.reset()
+        self._features = {}
+        self._postings = {}
+        self._norms = {}
+        for recipe_id, features in recipe_features().items():
+            self._add(recipe_id, features)
+        self._built = True
+
+    def _update(self, recipe_ids):
+        for recipe_id in recipe_ids:
+            self._remove(recipe_id)
+        for recipe_id, features in recipe_features(recipe_ids).items():
+            self._add(recipe_id, features)
+        self._norms = {}
+
+    def _actualize(self):
+        if not self._built:
+            self._build()
+        elif (self._checked_at is None
+              or monotonic() - self._checked_at
+              >= RECIPE_INDEX_CHECK_INTERVAL):
+            changed = self._changes.collect()
+            if changed:
+                self._update(changed)
+        else:
+            return
+        self._checked_at = monotonic()
+
+    def invalidate(self):
+        self._checked_at = None
+
+    def similar(self, recipe_id, limit):
+        """Возвращает id до `limit` самых похожих рецептов."""
+
+        with self._lock:
+            self._actualize()
+            features = self._features.get(recipe_id)
+            if not features:
+                return []
+            scores = {}
+            for feature in sorted(
+                features, key=lambda feature: len(self._postings[feature])
+            ):
+                weight = self._weight(feature) ** 2
+                postings = self._postings[feature]
+                if scores and len(postings) > SIMILAR_MAX_POSTINGS:
+                    postings = postings.intersection(scores)
+                for other_id in postings:
+                    scores[other_id] = scores.get(other_id, 0) + weight
+            scores.pop(recipe_id, None)
+            return nlargest(
+                limit, scores,
+                key=lambda other_id: (
+                    scores[other_id] / self._norm(other_id), other_id
+                )
+            )
+
+
+similarity_index = SimilarityIndex()
+
+
+def invalidate_similarity_index():
+    """Проверяет изменения рецептов при следующем поиске в этом процессе."""
+
+    transaction.on_commit(similarity_index.invalidate)
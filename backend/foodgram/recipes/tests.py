@@ -0,0 +1,347 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from time import monotonic
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from foodgram.constants import (INGREDIENT_INDEX_CHECK_INTERVAL,
+                                RECIPE_INDEX_CHECK_INTERVAL)
+from recipes import images
+from recipes.bulk import insert_new
+from recipes.feed import feed_filter
+from recipes.ingredient_index import IngredientIndex
+from recipes.models import (FavoriteRecipe, FeedEntry, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag, User)
+from recipes.pantry_index import PantryIndex
+from recipes.shopping_cart import get_cart_totals
+from recipes.similarity import SimilarityIndex
+from users.models import Follow
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def create_recipe(author, name, ingredients, tags=()):
+    recipe = Recipe.objects.create(
+        author=author, name=name, text=name, cooking_time=1,
+        image='recipes/images/recipe.png'
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for ingredient in ingredients
+    )
+    recipe.tags.set(tags)
+    return recipe
+
+
+def after_check_interval(module):
+    """Сдвигает часы индекса так, чтобы он проверил изменения."""
+
+    return mock.patch(
+        f'recipes.{module}.monotonic',
+        return_value=monotonic() + RECIPE_INDEX_CHECK_INTERVAL
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class IngredientIndexTests(TestCase):
+    """Тесты индекса ингредиентов."""
+
+    def setUp(self):
+        Ingredient.objects.create(name='зелень', measurement_unit='г')
+        self.index = IngredientIndex()
+
+    def test_sees_changes_made_outside_process(self):
+        self.assertEqual(self.index.search('зефир', 10), [])
+        # Другой процесс меняет только базу данных, не вызывая
+        # сигналы и не обновляя кэш этого процесса.
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='зефир', measurement_unit='шт')]
+        )
+        with mock.patch(
+            'recipes.ingredient_index.monotonic',
+            return_value=monotonic() + INGREDIENT_INDEX_CHECK_INTERVAL
+        ):
+            found = self.index.search('зефир', 10)
+        self.assertEqual([item['name'] for item in found], ['зефир'])
+
+    def test_sees_deleted_ingredients(self):
+        self.assertEqual(len(self.index.search('зел', 10)), 1)
+        Ingredient.objects.all().delete()
+        self.index.invalidate()
+        self.assertEqual(self.index.search('зел', 10), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CartTotalsTests(TestCase):
+    """Тесты кэша списка покупок."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='суп', text='суп', cooking_time=1,
+            image='recipes/images/soup.png'
+        )
+        self.row = RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient, amount=7
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.assertEqual(
+            get_cart_totals(self.user.id), {self.ingredient.id: 7}
+        )
+
+    def test_cart_changed_outside_process(self):
+        # Другой процесс меняет только базу данных, не вызывая сигналы.
+        recipe = create_recipe(self.user, 'соус', (self.ingredient,))
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(user=self.user, recipe=recipe)]
+        )
+        self.assertEqual(
+            get_cart_totals(self.user.id), {self.ingredient.id: 8}
+        )
+        ShoppingCart.objects.filter(recipe=self.recipe).delete()
+        self.assertEqual(
+            get_cart_totals(self.user.id), {self.ingredient.id: 1}
+        )
+
+    def test_cart_rows_deleted(self):
+        ShoppingCart.objects.filter(user=self.user).delete()
+        self.assertEqual(get_cart_totals(self.user.id), {})
+
+    def test_recipe_ingredient_changed_outside_api(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.row.amount = 3
+            self.row.save()
+        self.assertEqual(
+            get_cart_totals(self.user.id), {self.ingredient.id: 3}
+        )
+
+    def test_ingredient_deleted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.delete()
+        self.assertEqual(get_cart_totals(self.user.id), {})
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PantryIndexTests(TestCase):
+    """Тесты подбора рецептов по продуктам в наличии."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        self.salt, self.egg, self.milk, self.fish = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'яйцо', 'молоко', 'рыба')
+        )
+        self.omelette = create_recipe(
+            self.author, 'омлет', (self.salt, self.egg)
+        )
+        self.pudding = create_recipe(
+            self.author, 'пудинг', (self.salt, self.egg, self.milk)
+        )
+        create_recipe(self.author, 'уха', (self.fish,))
+        self.index = PantryIndex()
+
+    def test_match_order_and_missing(self):
+        self.assertEqual(
+            self.index.match((self.salt.id, self.egg.id), 10),
+            [(self.omelette.id, 1, []),
+             (self.pudding.id, 1 - 1 / 3, [self.milk.id])]
+        )
+        self.assertEqual(
+            self.index.match((self.salt.id, self.egg.id), 10, max_missing=0),
+            [(self.omelette.id, 1, [])]
+        )
+
+    def test_sees_changes_made_outside_process(self):
+        self.index.match((self.salt.id,), 10)
+        RecipeIngredient.objects.bulk_create([RecipeIngredient(
+            recipe=self.omelette, ingredient=self.milk, amount=1
+        )])
+        Recipe.objects.filter(pk=self.omelette.pk).update(
+            updated_at=timezone.now()
+        )
+        Recipe.objects.filter(pk=self.pudding.pk).delete()
+        with after_check_interval('pantry_index'):
+            matches = self.index.match((self.salt.id, self.egg.id), 10)
+        self.assertEqual(
+            matches, [(self.omelette.id, 1 - 1 / 3, [self.milk.id])]
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SimilarityIndexTests(TestCase):
+    """Тесты индекса похожих рецептов."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        self.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('соль', 'яйцо', 'молоко', 'рыба', 'лук')
+        ]
+        self.index = SimilarityIndex()
+
+    def test_similar_order(self):
+        salt, egg, milk, fish, onion = self.ingredients
+        tag = Tag.objects.create(name='обед', slug='lunch', color='#000000')
+        omelette = create_recipe(self.author, 'омлет', (salt, egg, milk))
+        fried_eggs = create_recipe(self.author, 'яичница', (salt, egg))
+        fish_soup = create_recipe(self.author, 'уха', (salt, fish), (tag,))
+        porridge = create_recipe(self.author, 'каша', (milk, onion), (tag,))
+        self.assertEqual(
+            self.index.similar(omelette.id, 10),
+            [fried_eggs.id, porridge.id, fish_soup.id]
+        )
+        self.assertEqual(self.index.similar(fish_soup.id, 1), [porridge.id])
+
+    def test_incremental_update_matches_rebuild(self):
+        salt, egg, milk, fish, onion = self.ingredients
+        for name, ingredients in (
+            ('омлет', (egg, onion)),
+            ('пудинг', (salt, milk)),
+            ('яичница', (salt, onion)),
+            ('молочный суп', (milk,)),
+        ):
+            create_recipe(self.author, name, ingredients)
+        query = Recipe.objects.get(name='яичница')
+        self.index.similar(query.id, 10)
+        # Новый рецепт меняет веса IDF, а с ними нормы и порядок
+        # похожих даже для рецептов, которые не изменились.
+        create_recipe(self.author, 'уха', (fish, onion))
+        with after_check_interval('similarity'):
+            found = self.index.similar(query.id, 10)
+        self.assertEqual(found, SimilarityIndex().similar(query.id, 10))
+        Recipe.objects.filter(name='омлет').delete()
+        self.index.invalidate()
+        found = self.index.similar(query.id, 10)
+        self.assertEqual(found, SimilarityIndex().similar(query.id, 10))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class InsertNewTests(TestCase):
+    """Тесты массовой вставки связей."""
+
+    def test_skips_rows_inserted_concurrently(self):
+        user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password'
+        )
+        soup = create_recipe(user, 'суп', ())
+        salad = create_recipe(user, 'салат', ())
+        # Строку вставил параллельный запрос после проверки наличия.
+        FavoriteRecipe.objects.create(user=user, recipe=soup)
+        favorites = FavoriteRecipe.objects.filter(user=user)
+        self.assertEqual(
+            insert_new(favorites, 'recipe_id', {soup.id, salad.id},
+                       user=user),
+            {salad.id}
+        )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch('recipes.feed.FEED_FANOUT_LIMIT', 1)
+class FeedTests(TestCase):
+    """Тесты рассылки рецептов по лентам и подмешивания при чтении."""
+
+    def setUp(self):
+        self.author, self.reader, self.other = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                password='password'
+            )
+            for name in ('author', 'reader', 'other')
+        )
+        for follower in (self.reader, self.other):
+            Follow.objects.create(follower=follower, following=self.author)
+
+    def feed(self, user):
+        return set(Recipe.objects.filter(
+            feed_filter(user)
+        ).values_list('id', flat=True))
+
+    def entries(self, user):
+        return set(FeedEntry.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True))
+
+    def test_popular_author_is_pulled(self):
+        recipe = create_recipe(self.author, 'суп', ())
+        self.assertEqual(self.entries(self.reader), set())
+        self.assertEqual(self.feed(self.reader), {recipe.id})
+
+    def test_fan_out_resumes_below_limit(self):
+        pulled = create_recipe(self.author, 'суп', ())
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.filter(follower=self.other).delete()
+        self.assertEqual(self.entries(self.reader), {pulled.id})
+        fanned_out = create_recipe(self.author, 'салат', ())
+        self.assertEqual(self.entries(self.reader), {pulled.id, fanned_out.id})
+        self.assertEqual(self.feed(self.reader), {pulled.id, fanned_out.id})
+
+
+class CsvImportTests(TestCase):
+    """Тесты импорта ингредиентов."""
+
+    def test_default_files(self):
+        for file_format in ('csv', 'json'):
+            with self.subTest(format=file_format):
+                out = StringIO()
+                call_command('csv_import', format=file_format, dry_run=True,
+                             stdout=out)
+                self.assertIn('прочитано 2188', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionsTests(TestCase):
+    """Тесты создания уменьшенных копий изображений."""
+
+    def test_retries_save_without_rebuilding(self):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48)).save(buffer, 'PNG')
+        recipe = Recipe.objects.create(
+            author=User.objects.create_user(
+                username='cook', email='cook@example.com', password='password'
+            ),
+            name='суп', text='суп', cooking_time=1,
+            image=ContentFile(buffer.getvalue(), name='soup.png')
+        )
+        save = images.save_renditions
+        attempts = []
+
+        def locked_once(*args):
+            attempts.append(args)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            return save(*args)
+
+        with mock.patch.object(
+            images, 'build_renditions', wraps=images.build_renditions
+        ) as build, mock.patch.object(
+            images, 'save_renditions', side_effect=locked_once
+        ), mock.patch.object(images, 'sleep'):
+            self.assertTrue(images.update_renditions(recipe.id))
+        build.assert_called_once()
+        self.assertEqual(len(attempts), 2)
+        recipe.refresh_from_db()
+        self.assertEqual(
+            recipe.image_renditions['variants']['thumbnail']['width'], 64
+        )
@@ -0,0 +1,22 @@
+"""Действия, откладываемые до фиксации транзакции."""
+from django.db import transaction
+
+
+def on_commit_once(callback, *items, using=None):
+    """Вызывает `callback` один раз после фиксации транзакции.
+
+    Элементы всех вызовов с тем же `callback` за время транзакции
+    собираются в одно множество, которое передаётся в `callback`.
+    Элементы откаченной транзакции достаются следующей, поэтому
+    `callback` должен допускать лишние элементы.
+    """
+
+    connection = transaction.get_connection(using)
+    pending = connection.__dict__.setdefault('pending_on_commit', {})
+    pending.setdefault(callback, set()).update(items)
+
+    def run():
+        if callback in pending:
+            callback(pending.pop(callback))
+
+    transaction.on_commit(run, using=using)
@@ -36,13 +36,14 @@ class UserAdmin(BaseUserAdmin):
     list_per_page = LIST_PER_PAGE
     empty_value_display = 'Не указано'
 
-    @admin.display(description='Кол-во рецептов')
+    @admin.display(description='Кол-во рецептов', ordering='recipes_count')
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    @admin.display(description='Кол-во подписчиков')
+    @admin.display(description='Кол-во подписчиков',
+                   ordering='followers_count')
     def get_followers_count(self, obj):
-        return obj.following.count()
+        return obj.followers_count
 
 
 @admin.register(Follow)
@@ -53,8 +54,10 @@ class FollowAdmin(admin.ModelAdmin):
         'follower',
         'following',
     )
-    search_fields = ('follower', 'following',)
-    list_filter = ('follower', 'following',)
+    search_fields = ('follower__username', 'follower__email',
+                     'following__username', 'following__email')
+    list_select_related = ('follower', 'following')
+    autocomplete_fields = ('follower', 'following')
     list_display_links = ('follower', 'following',)
     list_per_page = LIST_PER_PAGE
     empty_value_display = 'Не указано'
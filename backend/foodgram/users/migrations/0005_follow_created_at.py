@@ -0,0 +1,25 @@
+# Generated by Django 4.2.13 on 2026-10-18 19:31
+
+import datetime
+
+from django.db import migrations, models
+
+# Дата существующих записей неизвестна: ставим заведомо старую, чтобы
+# они не считались новыми событиями в рейтинге trending.
+UNKNOWN_DATE = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=UNKNOWN_DATE, verbose_name='Дата подписки'),
+            preserve_default=False,
+        ),
+    ]
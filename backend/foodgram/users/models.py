@@ -29,6 +29,13 @@ class FoodgramUser(AbstractUser):
     email = models.EmailField(
         'email address', max_length=LENGTH_FOR_FIELD_EMAIL, unique=True
     )
+    recipes_count = models.PositiveIntegerField(
+        'Кол-во рецептов', default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Кол-во подписчиков', default=0, editable=False
+    )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
 
     class Meta:
         verbose_name = 'пользователь'
@@ -53,6 +60,11 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор',
     )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата подписки',
+    )
 
     class Meta:
         verbose_name = 'подписка'
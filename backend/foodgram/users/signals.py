@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.counters import shift_counter
+from recipes.feed import backfill_feed, clear_feed, resume_fan_out
+from users.models import Follow, FoodgramUser
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(instance, created, **kwargs):
+    if created:
+        shift_counter(
+            FoodgramUser, instance.following_id, 'followers_count', 1
+        )
+        backfill_feed(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(instance, **kwargs):
+    shift_counter(FoodgramUser, instance.following_id, 'followers_count', -1)
+    clear_feed(instance.follower_id, instance.following_id)
+    resume_fan_out(instance.following_id)
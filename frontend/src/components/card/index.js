@@ -7,6 +7,8 @@ const Card = ({
   name = 'Без названия',
   id,
   image,
+  image_renditions = {},
+  image_placeholder,
   is_favorited,
   is_in_shopping_cart,
   tags,
@@ -21,7 +23,10 @@ const Card = ({
       <LinkComponent
         className={styles.card__title}
         href={`/recipes/${id}`}
-        title={<div className={styles.card__image} style={{ backgroundImage: `url(${ image })` }} />}
+        title={<div className={styles.card__image} style={{ backgroundImage: [
+          `url(${ (image_renditions.card || {}).url || image })`,
+          image_placeholder && `url(${ image_placeholder })`
+        ].filter(Boolean).join(', ') }} />}
       />
       <div className={styles.card__body}>
         <LinkComponent